@@ -0,0 +1,333 @@
+"""
+Instantánea columnar de las líneas de factura para consultas analíticas.
+
+Las consultas ad hoc de finanzas (ventas por producto en un trimestre, por
+cliente en un rango arbitrario) se resuelven sobre archivos locales en lugar
+de recorrer facturas y factura_items en la base de producción. Cada columna es
+un archivo binario plano que se abre con numpy.memmap:
+
+    dia        int32  días desde 1970-01-01 de la fecha de la factura
+    factura    int32  id de la factura
+    cliente    int32  código del cliente en el diccionario cliente_ids
+    producto   int32  código del producto en el diccionario producto_ids
+    cantidad   int32
+    precio     int64  importe en céntimos (ESCALA)
+    subtotal   int64  importe en céntimos
+
+Las filas están ordenadas por fecha, así que un rango de fechas es un corte
+por búsqueda binaria. actualizar() solo exporta las facturas posteriores a la
+última exportada; meta.json registra cuántas filas son válidas y se reemplaza
+al final, por lo que un lector nunca ve una actualización a medias.
+
+Requiere numpy (no lo usa la aplicación web).
+
+Uso:
+    python analitica.py actualizar [--dir analitica] [--margen 300] [--completa]
+    python analitica.py consultar --agrupar producto --desde 2026-07-01 --hasta 2026-09-30 --limite 10
+"""
+import argparse
+import datetime
+import fcntl
+import json
+import os
+import shutil
+from collections import namedtuple
+from decimal import Decimal
+
+import numpy as np
+
+from db import get_db_connection
+
+DIRECTORIO = 'analitica'
+# Importes guardados como enteros de céntimos
+DECIMALES = 2
+ESCALA = 10 ** DECIMALES
+# Solo se exportan facturas con más de MARGEN segundos: una transacción aún
+# abierta con fecha anterior quedaría fuera de la instantánea para siempre.
+MARGEN = 300
+LOTE = 100000
+
+COLUMNAS = {
+    'dia': np.int32,
+    'factura': np.int32,
+    'cliente': np.int32,
+    'producto': np.int32,
+    'cantidad': np.int32,
+    'precio': np.int64,
+    'subtotal': np.int64,
+}
+DICCIONARIOS = ('cliente', 'producto')
+AGRUPACIONES = ('producto', 'cliente', 'dia', 'mes')
+
+_EPOCA = datetime.date(1970, 1, 1)
+
+Grupo = namedtuple('Grupo', 'clave importe cantidad lineas facturas')
+
+
+def _ruta(directorio, nombre):
+    return os.path.join(directorio, f"{nombre}.bin")
+
+
+def _leer_meta(directorio):
+    try:
+        with open(os.path.join(directorio, 'meta.json'), encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {'filas': 0, 'hasta': None, 'diccionarios': {nombre: 0 for nombre in DICCIONARIOS}}
+
+
+def _escribir_meta(directorio, meta):
+    temporal = os.path.join(directorio, 'meta.json.tmp')
+    with open(temporal, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporal, os.path.join(directorio, 'meta.json'))
+
+
+def _mapear(ruta, dtype, filas):
+    if filas == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(ruta, dtype=dtype, mode='r', shape=(filas,))
+
+
+def _codificar(ids, codigos, archivo):
+    """Códigos de diccionario para `ids`; los ids nuevos se añaden al final de `archivo`."""
+    unicos, inversa = np.unique(ids, return_inverse=True)
+    nuevos = [int(i) for i in unicos if int(i) not in codigos]
+    if nuevos:
+        for i in nuevos:
+            codigos[i] = len(codigos)
+        archivo.write(np.asarray(nuevos, dtype=np.int32).tobytes())
+    return np.fromiter((codigos[int(i)] for i in unicos), dtype=np.int32, count=len(unicos))[inversa]
+
+
+def actualizar(conn, directorio=DIRECTORIO, margen=MARGEN, completa=False):
+    """
+    Añade a la instantánea las líneas de las facturas nuevas. Devuelve el
+    número de filas nuevas. Con `completa` la reconstruye desde cero en un
+    directorio hermano y al terminar la cambia por la anterior.
+    """
+    directorio = os.path.normpath(directorio)
+    # El bloqueo va fuera del directorio, que una reconstrucción reemplaza
+    with open(directorio + '.bloqueo', 'w') as bloqueo:
+        # Una sola actualización a la vez; los lectores no se bloquean
+        fcntl.flock(bloqueo, fcntl.LOCK_EX)
+        if not completa:
+            os.makedirs(directorio, exist_ok=True)
+            return _exportar(conn, directorio, margen)
+
+        # Restos de una reconstrucción interrumpida
+        nuevo, anterior = directorio + '.nueva', directorio + '.anterior'
+        for resto in (nuevo, anterior):
+            shutil.rmtree(resto, ignore_errors=True)
+        os.makedirs(nuevo)
+        nuevas = _exportar(conn, nuevo, margen)
+        # Los lectores que ya abrieron la anterior siguen leyéndola hasta cerrarla
+        if os.path.isdir(directorio):
+            os.rename(directorio, anterior)
+        os.rename(nuevo, directorio)
+        shutil.rmtree(anterior, ignore_errors=True)
+        return nuevas
+
+
+def _exportar(conn, directorio, margen):
+    """Exporta a `directorio` las líneas posteriores a su meta.json. Requiere el bloqueo."""
+    meta = _leer_meta(directorio)
+
+    # Descartar lo escrito por una actualización interrumpida
+    for nombre, dtype in COLUMNAS.items():
+        with open(_ruta(directorio, nombre), 'ab') as f:
+            f.truncate(meta['filas'] * np.dtype(dtype).itemsize)
+    codigos = {}
+    for nombre in DICCIONARIOS:
+        ruta = _ruta(directorio, f"{nombre}_ids")
+        with open(ruta, 'ab') as f:
+            f.truncate(meta['diccionarios'][nombre] * 4)
+        ids = _mapear(ruta, np.int32, meta['diccionarios'][nombre])
+        codigos[nombre] = {int(i): codigo for codigo, i in enumerate(ids)}
+
+    cur = conn.cursor()
+    cur.execute('SELECT localtimestamp - make_interval(secs => %s);', (margen,))
+    hasta = cur.fetchone()[0]
+    cur.close()
+
+    # Cursor del lado del servidor: las líneas llegan en lotes de LOTE filas
+    cur = conn.cursor(name='analitica_exportar')
+    cur.itersize = LOTE
+    cur.execute(
+        "SELECT f.fecha::date - DATE '1970-01-01', f.id, f.cliente_id, fi.producto_id, fi.cantidad, "
+        "       (fi.precio * %(escala)s)::bigint, (fi.subtotal * %(escala)s)::bigint "
+        "FROM facturas f JOIN factura_items fi ON fi.factura_id = f.id "
+        "WHERE f.fecha > %(desde)s AND f.fecha <= %(hasta)s "
+        "ORDER BY f.fecha, f.id, fi.id;",
+        {'escala': ESCALA, 'desde': meta['hasta'] or '-infinity', 'hasta': hasta}
+    )
+
+    archivos = {nombre: open(_ruta(directorio, nombre), 'ab') for nombre in COLUMNAS}
+    diccionarios = {nombre: open(_ruta(directorio, f"{nombre}_ids"), 'ab') for nombre in DICCIONARIOS}
+    nuevas = 0
+    try:
+        while True:
+            filas = cur.fetchmany(LOTE)
+            if not filas:
+                break
+            datos = np.array(filas, dtype=np.int64)
+            for posicion, (nombre, dtype) in enumerate(COLUMNAS.items()):
+                columna = datos[:, posicion]
+                if nombre in DICCIONARIOS:
+                    columna = _codificar(columna, codigos[nombre], diccionarios[nombre])
+                archivos[nombre].write(columna.astype(dtype).tobytes())
+            nuevas += len(filas)
+        for f in (*archivos.values(), *diccionarios.values()):
+            f.flush()
+            os.fsync(f.fileno())
+    finally:
+        for f in (*archivos.values(), *diccionarios.values()):
+            f.close()
+        cur.close()
+        conn.rollback()
+
+    meta['filas'] += nuevas
+    meta['hasta'] = hasta.isoformat()
+    meta['diccionarios'] = {nombre: len(codigos[nombre]) for nombre in DICCIONARIOS}
+    meta['decimales'] = DECIMALES
+    _escribir_meta(directorio, meta)
+    return nuevas
+
+
+class Instantanea:
+    """Columnas de la instantánea mapeadas en memoria (solo lectura)."""
+
+    def __init__(self, directorio=DIRECTORIO):
+        meta = _leer_meta(directorio)
+        self.filas = meta['filas']
+        self.hasta = meta['hasta']
+        self.decimales = meta.get('decimales', DECIMALES)
+        for nombre, dtype in COLUMNAS.items():
+            setattr(self, nombre, _mapear(_ruta(directorio, nombre), dtype, self.filas))
+        self.ids = {
+            nombre: _mapear(_ruta(directorio, f"{nombre}_ids"), np.int32, meta['diccionarios'][nombre])
+            for nombre in DICCIONARIOS
+        }
+
+    def _codigos(self, nombre, ids):
+        # ids -> códigos del diccionario; los ids ausentes no seleccionan nada
+        diccionario = np.asarray(self.ids[nombre])
+        return np.flatnonzero(np.isin(diccionario, np.asarray(list(ids), dtype=np.int32)))
+
+    def consultar(self, desde=None, hasta=None, clientes=None, productos=None, agrupar=None,
+                  orden='importe', limite=None):
+        """
+        Filtra por rango de fechas (inclusive), clientes y productos (ids) y agrupa
+        por `agrupar` (producto, cliente, dia, mes o None para un total).
+        Devuelve una lista de Grupo ordenada de mayor a menor por `orden`.
+        """
+        if agrupar is not None and agrupar not in AGRUPACIONES:
+            raise ValueError(f"Agrupación desconocida: {agrupar}")
+        if orden not in Grupo._fields[1:]:
+            raise ValueError(f"Orden desconocido: {orden}")
+
+        # Las filas están ordenadas por día: el rango es un corte, no un filtro
+        inicio = 0 if desde is None else int(np.searchsorted(self.dia, (desde - _EPOCA).days, 'left'))
+        fin = self.filas if hasta is None else int(np.searchsorted(self.dia, (hasta - _EPOCA).days, 'right'))
+        corte = slice(inicio, fin)
+
+        mascara = None
+        if clientes is not None:
+            mascara = np.isin(self.cliente[corte], self._codigos('cliente', clientes))
+        if productos is not None:
+            seleccion = np.isin(self.producto[corte], self._codigos('producto', productos))
+            mascara = seleccion if mascara is None else mascara & seleccion
+
+        def columna(nombre):
+            datos = getattr(self, nombre)[corte]
+            return datos if mascara is None else datos[mascara]
+
+        subtotal, cantidad, factura = columna('subtotal'), columna('cantidad'), columna('factura')
+        if agrupar is None:
+            claves, grupos = np.zeros(1, dtype=np.int64), np.zeros(len(subtotal), dtype=np.int64)
+        elif agrupar in DICCIONARIOS:
+            grupos = columna(agrupar)
+            claves = np.asarray(self.ids[agrupar], dtype=np.int64)
+        else:
+            dias = columna('dia')
+            if agrupar == 'mes':
+                dias = dias.astype('datetime64[D]').astype('datetime64[M]').astype(np.int64)
+            claves, grupos = np.unique(dias, return_inverse=True)
+        n = len(claves)
+
+        # Sumas exactas mientras cada grupo no pase de 2**53 céntimos
+        importe = np.rint(np.bincount(grupos, weights=subtotal, minlength=n)).astype(np.int64)
+        unidades = np.rint(np.bincount(grupos, weights=cantidad, minlength=n)).astype(np.int64)
+        lineas = np.bincount(grupos, minlength=n)
+        # Facturas distintas por grupo: pares (grupo, factura) únicos; ordenar y
+        # comparar vecinos es bastante más rápido que np.unique con hash
+        modulo = int(factura.max(initial=0)) + 1
+        pares = np.sort(grupos.astype(np.int64) * modulo + factura)
+        pares = pares[np.concatenate(([True], pares[1:] != pares[:-1]))] if len(pares) else pares
+        facturas = np.bincount(pares // modulo, minlength=n)
+
+        valores = {'importe': importe, 'cantidad': unidades, 'lineas': lineas, 'facturas': facturas}
+        presentes = np.flatnonzero(lineas)
+        presentes = presentes[np.argsort(-valores[orden][presentes], kind='stable')]
+        if limite is not None:
+            presentes = presentes[:limite]
+
+        return [
+            Grupo(self._clave(agrupar, claves[i]), Decimal(int(importe[i])).scaleb(-self.decimales),
+                  int(unidades[i]), int(lineas[i]), int(facturas[i]))
+            for i in presentes
+        ]
+
+    def _clave(self, agrupar, valor):
+        if agrupar == 'dia':
+            return _EPOCA + datetime.timedelta(days=int(valor))
+        if agrupar == 'mes':
+            return str(np.datetime64(int(valor), 'M'))
+        return None if agrupar is None else int(valor)
+
+
+def _nombres(cur, agrupar, claves):
+    if agrupar not in DICCIONARIOS or not claves:
+        return {}
+    cur.execute(f'SELECT id, nombre FROM {agrupar}s WHERE id = ANY(%s);', (claves,))
+    return dict(cur.fetchall())
+
+
+if __name__ == '__main__':
+    from fabrica import configurar_desde_entorno
+
+    parser = argparse.ArgumentParser(description="Instantánea columnar de las líneas de factura")
+    parser.add_argument('accion', choices=('actualizar', 'consultar'))
+    parser.add_argument('--dir', default=DIRECTORIO)
+    parser.add_argument('--margen', type=int, default=MARGEN, help="segundos")
+    parser.add_argument('--completa', action='store_true', help="reconstruir desde cero")
+    parser.add_argument('--desde', type=datetime.date.fromisoformat)
+    parser.add_argument('--hasta', type=datetime.date.fromisoformat)
+    parser.add_argument('--cliente', type=int, action='append')
+    parser.add_argument('--producto', type=int, action='append')
+    parser.add_argument('--agrupar', choices=AGRUPACIONES)
+    parser.add_argument('--orden', default='importe', choices=Grupo._fields[1:])
+    parser.add_argument('--limite', type=int)
+    args = parser.parse_args()
+    configurar_desde_entorno()
+
+    conn = get_db_connection()
+    try:
+        if args.accion == 'actualizar':
+            filas = actualizar(conn, args.dir, args.margen, args.completa)
+            print(f"Filas nuevas: {filas}")
+        else:
+            resultado = Instantanea(args.dir).consultar(
+                args.desde, args.hasta, args.cliente, args.producto, args.agrupar, args.orden, args.limite
+            )
+            cur = conn.cursor()
+            nombres = _nombres(cur, args.agrupar, [g.clave for g in resultado])
+            cur.close()
+            print(f"{args.agrupar or 'total':<40}{'importe':>16}{'cantidad':>12}{'lineas':>10}{'facturas':>10}")
+            for g in resultado:
+                etiqueta = 'total' if g.clave is None else f"{g.clave} {nombres.get(g.clave, '')}".strip()
+                print(f"{etiqueta[:39]:<40}{g.importe:>16}{g.cantidad:>12}{g.lineas:>10}{g.facturas:>10}")
+    finally:
+        conn.close()
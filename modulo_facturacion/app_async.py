@@ -0,0 +1,111 @@
+"""
+Modo de servicio asíncrono para las rutas de lectura.
+
+listar_facturas, ver_factura, listar_clientes y listar_productos se atienden
+con handlers async (Quart) sobre un pool asyncpg: mientras PostgreSQL
+responde, el proceso sigue atendiendo otras peticiones en lugar de bloquear un
+hilo por cada una. El resto de rutas (formularios y escrituras) se delega a la
+aplicación Flask síncrona de app.py a través de un adaptador WSGI.
+
+Uso: uvicorn app_async:aplicacion --workers 4
+"""
+import re
+
+import asyncpg
+from asgiref.wsgi import WsgiToAsgi
+from quart import Blueprint, Quart, abort, render_template, request
+
+import db
+import listados
+from app import app as app_sync
+from preparadas import SENTENCIAS
+
+app = Quart(__name__)
+# Mismos nombres de blueprint que la app síncrona, para que url_for en las plantillas funcione igual
+facturas_bp = Blueprint('facturas', __name__)
+clientes_bp = Blueprint('clientes', __name__)
+productos_bp = Blueprint('productos', __name__)
+
+# Peticiones GET que atiende el modo async; todo lo demás va a la app síncrona
+_RUTAS_LECTURA = re.compile(r'^/(facturas|clientes|productos|factura/\d+)/?$')
+
+_pool = None
+
+
+@app.before_serving
+async def _abrir_pool():
+    global _pool
+    _pool = await asyncpg.create_pool(min_size=db.POOL_MIN, max_size=db.POOL_MAX, **db.DB_CONFIG)
+
+
+@app.after_serving
+async def _cerrar_pool():
+    await _pool.close()
+
+
+async def _consultar(nombre, *params):
+    # Mismo SQL que las sentencias preparadas del modo síncrono;
+    # asyncpg ya prepara y cachea cada sentencia por conexión.
+    async with _pool.acquire() as conn:
+        return await conn.fetch(SENTENCIAS[nombre][0], *params)
+
+
+@facturas_bp.route('/facturas')
+async def listar_facturas():
+    facturas = await _consultar('listar_facturas')
+    return await render_template('facturas.html', facturas=facturas)
+
+
+@facturas_bp.route('/factura/<int:id>')
+async def ver_factura(id):
+    async with _pool.acquire() as conn:
+        factura = await conn.fetchrow(SENTENCIAS['factura_cabecera'][0], id)
+        if factura is None:
+            abort(404)
+        items = await conn.fetch(SENTENCIAS['factura_items'][0], id)
+    return await render_template('ver_factura.html', factura=factura, items=items)
+
+
+async def _render_listado(entidad, template):
+    pagina, q, orden, direccion = listados.parametros(request.args, entidad)
+    nombre, params = listados.sentencia(entidad, pagina, q, orden, direccion)
+    listado = listados.pagina_de(await _consultar(nombre, *params), pagina, q, orden, direccion)
+    return await render_template(template, listado=listado, **{entidad: listado.filas})
+
+
+@clientes_bp.route('/clientes')
+async def listar_clientes():
+    return await _render_listado('clientes', 'clientes.html')
+
+
+@productos_bp.route('/productos')
+async def listar_productos():
+    return await _render_listado('productos', 'listar_productos.html')
+
+
+app.register_blueprint(facturas_bp)
+app.register_blueprint(clientes_bp)
+app.register_blueprint(productos_bp)
+
+
+# Las plantillas enlazan también a rutas de la app síncrona: registrarlas aquí
+# solo para que url_for pueda construir sus URLs.
+async def _solo_sincrona(**kwargs):
+    abort(404)
+
+for _regla in app_sync.url_map.iter_rules():
+    if _regla.endpoint not in app.view_functions:
+        app.add_url_rule(_regla.rule, endpoint=_regla.endpoint, view_func=_solo_sincrona,
+                         methods=_regla.methods - {'HEAD', 'OPTIONS'})
+
+_app_sync_asgi = WsgiToAsgi(app_sync)
+
+
+async def aplicacion(scope, receive, send):
+    """Punto de entrada ASGI: lecturas al modo async, el resto a Flask."""
+    if scope['type'] == 'http' and not (
+        scope['method'] in ('GET', 'HEAD') and _RUTAS_LECTURA.match(scope['path'])
+    ):
+        await _app_sync_asgi(scope, receive, send)
+    else:
+        await app(scope, receive, send)
@@ -0,0 +1,118 @@
+"""
+Ventas por producto de un trimestre y por cliente de todo el año: GROUP BY en
+PostgreSQL contra la instantánea columnar de analitica.py, sobre todas las
+facturas de la base. Comprueba que ambos den los mismos importes.
+
+Genera `facturas` facturas de prueba (3 líneas cada una) repartidas en el
+último año, exporta la instantánea completa y luego mide una actualización
+incremental con `nuevas` facturas más. Los datos de prueba se borran al final.
+
+Uso (desde modulo_facturacion/): python benchmarks/bench_analitica.py [facturas] [nuevas] [iteraciones]
+"""
+import datetime
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import analitica  # noqa: E402
+from db import get_db_connection  # noqa: E402
+from fabrica import configurar_desde_entorno  # noqa: E402
+
+_SQL = {
+    'producto': (
+        'SELECT fi.producto_id, sum(fi.subtotal) FROM facturas f JOIN factura_items fi ON fi.factura_id = f.id '
+        'WHERE f.fecha >= %s AND f.fecha < %s GROUP BY 1;'
+    ),
+    'cliente': (
+        'SELECT f.cliente_id, sum(fi.subtotal) FROM facturas f JOIN factura_items fi ON fi.factura_id = f.id '
+        'WHERE f.fecha >= %s AND f.fecha < %s GROUP BY 1;'
+    ),
+}
+
+
+def _generar(cur, prefijo, facturas, dias):
+    # Fechas al azar en los últimos `dias` días; con 0, la hora actual
+    cur.execute('SELECT id FROM clientes;')
+    clientes = [r[0] for r in cur.fetchall()]
+    cur.execute('SELECT id FROM productos;')
+    productos = [r[0] for r in cur.fetchall()]
+    cur.execute(
+        "INSERT INTO facturas (numero, cliente_id, total, fecha) "
+        "SELECT %s || g, (%s::int[])[1 + (g %% %s)], 0, "
+        "       localtimestamp - random() * %s "
+        "FROM generate_series(1, %s) g;",
+        (prefijo, clientes, len(clientes), datetime.timedelta(days=dias), facturas)
+    )
+    cur.execute(
+        "INSERT INTO factura_items (factura_id, producto_id, cantidad, precio, subtotal) "
+        "SELECT f.id, (%s::int[])[1 + ((f.id * 7 + l) %% %s)], 1 + l, 10.25 * l, 10.25 * l * (1 + l) "
+        "FROM facturas f CROSS JOIN generate_series(1, 3) l WHERE f.numero LIKE %s;",
+        (productos, len(productos), prefijo + '%')
+    )
+
+
+def _medir(funcion, iteraciones):
+    inicio = time.perf_counter()
+    for _ in range(iteraciones):
+        resultado = funcion()
+    return (time.perf_counter() - inicio) / iteraciones * 1000, resultado
+
+
+def main(facturas=300000, nuevas=10000, iteraciones=10):
+    prefijo = f"BA-{os.getpid()}-"
+    directorio = tempfile.mkdtemp(prefix='facturacion-analitica-')
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        _generar(cur, prefijo, facturas, 365)
+        conn.commit()
+        cur.execute('ANALYZE facturas; ANALYZE factura_items;')
+
+        inicio = time.perf_counter()
+        filas = analitica.actualizar(conn, directorio, margen=0)
+        print(f"exportación completa: {filas} líneas en {time.perf_counter() - inicio:.2f} s")
+
+        instantanea = analitica.Instantanea(directorio)
+        hoy = datetime.date.today()
+        casos = {
+            'producto': (hoy - datetime.timedelta(days=90), hoy),
+            'cliente': (hoy - datetime.timedelta(days=365), hoy),
+        }
+        print(f"{'ventas por':<12}{'SQL ms':>10}{'columnar ms':>14}")
+        for agrupar, (desde, hasta) in casos.items():
+            def sql():
+                cur.execute(_SQL[agrupar], (desde, hasta + datetime.timedelta(days=1)))
+                return dict(cur.fetchall())
+
+            def columnar():
+                return {g.clave: g.importe for g in instantanea.consultar(desde, hasta, agrupar=agrupar)}
+
+            sql_ms, esperado = _medir(sql, iteraciones)
+            col_ms, obtenido = _medir(columnar, iteraciones)
+            assert esperado == obtenido, f"importes distintos agrupando por {agrupar}"
+            print(f"{agrupar:<12}{sql_ms:>10.1f}{col_ms:>14.1f}")
+
+        _generar(cur, prefijo + 'N', nuevas, 0)
+        conn.commit()
+        inicio = time.perf_counter()
+        filas = analitica.actualizar(conn, directorio, margen=0)
+        print(f"actualización incremental: {filas} líneas en {time.perf_counter() - inicio:.2f} s")
+        assert analitica.Instantanea(directorio).filas == instantanea.filas + filas
+    finally:
+        conn.rollback()
+        cur.execute('DELETE FROM factura_items WHERE factura_id IN (SELECT id FROM facturas WHERE numero LIKE %s);',
+                    (prefijo + '%',))
+        cur.execute('DELETE FROM facturas WHERE numero LIKE %s;', (prefijo + '%',))
+        conn.commit()
+        cur.close()
+        conn.close()
+        shutil.rmtree(directorio, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    configurar_desde_entorno()
+    main(*(int(a) for a in sys.argv[1:4]))
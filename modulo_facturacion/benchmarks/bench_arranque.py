@@ -0,0 +1,68 @@
+"""
+Tiempo de arranque de un worker: importar la fábrica, crear la aplicación y
+servir la primera respuesta, cada vez en un proceso nuevo. Se mide con la caché
+de plantillas compiladas vacía (primer worker) y ya poblada (workers
+siguientes).
+
+Uso (desde modulo_facturacion/): python benchmarks/bench_arranque.py [arranques] [ruta]
+La ruta por defecto (/agregar_cliente) no toca la base de datos.
+"""
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+DIRECTORIO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_WORKER = '''
+import json, sys, time
+t0 = time.perf_counter()
+from fabrica import create_app
+t1 = time.perf_counter()
+app = create_app({"PLANTILLAS_CACHE_DIR": sys.argv[1]})
+t2 = time.perf_counter()
+respuesta = app.test_client().get(sys.argv[2])
+t3 = time.perf_counter()
+print(json.dumps({"importar": t1 - t0, "crear_app": t2 - t1, "primera_respuesta": t3 - t2,
+                  "total": t3 - t0, "status": respuesta.status_code}))
+'''
+
+
+def _arrancar(cache_dir, ruta):
+    salida = subprocess.run(
+        [sys.executable, '-c', _WORKER, cache_dir, ruta],
+        cwd=DIRECTORIO, capture_output=True, text=True, check=True
+    )
+    return json.loads(salida.stdout.strip().splitlines()[-1])
+
+
+def _resumen(nombre, medidas):
+    print(f"{nombre:<14}" + ''.join(
+        f"{statistics.median(m[k] for m in medidas) * 1000:>18.1f}"
+        for k in ('importar', 'crear_app', 'primera_respuesta', 'total')
+    ))
+
+
+def main(arranques=10, ruta='/agregar_cliente'):
+    cache_dir = tempfile.mkdtemp(prefix='facturacion-jinja-')
+    try:
+        frios, calientes = [], []
+        for _ in range(arranques):
+            shutil.rmtree(cache_dir)
+            os.makedirs(cache_dir)
+            frios.append(_arrancar(cache_dir, ruta))
+            calientes.append(_arrancar(cache_dir, ruta))
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    print(f"ruta={ruta} arranques={arranques} (medianas en ms)")
+    print(f"{'plantillas':<14}{'importar':>18}{'crear_app':>18}{'primera_resp':>18}{'total':>18}")
+    _resumen('sin caché', frios)
+    _resumen('con caché', calientes)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10, *sys.argv[2:3])
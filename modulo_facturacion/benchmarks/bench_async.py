@@ -0,0 +1,67 @@
+"""
+Compara las rutas de lectura servidas por la app síncrona (Flask) y por el
+modo async (app_async.py) con el mismo número de clientes concurrentes.
+
+Levantar ambos servidores con el mismo número de procesos, por ejemplo:
+    gunicorn -w 2 -b :5000 app:app
+    uvicorn app_async:aplicacion --workers 2 --port 5001
+y ejecutar (desde modulo_facturacion/):
+    python benchmarks/bench_async.py http://localhost:5000 http://localhost:5001 [concurrencia] [peticiones]
+"""
+import statistics
+import sys
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+RUTAS = ('/facturas', '/clientes', '/productos', '/factura/1')
+
+
+def _peticion(url):
+    inicio = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url, timeout=60) as respuesta:
+            respuesta.read()
+            ok = respuesta.status < 500
+    except Exception:
+        ok = False
+    return time.perf_counter() - inicio, ok
+
+
+def _medir(base, ruta, concurrencia, peticiones):
+    latencias, errores, lock = [], [0], threading.Lock()
+
+    def tarea(_):
+        duracion, ok = _peticion(base + ruta)
+        with lock:
+            latencias.append(duracion)
+            if not ok:
+                errores[0] += 1
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrencia) as executor:
+        list(executor.map(tarea, range(peticiones)))
+    total = time.perf_counter() - inicio
+    latencias.sort()
+    return {
+        'rps': peticiones / total,
+        'p50': statistics.median(latencias) * 1000,
+        'p99': latencias[min(len(latencias) - 1, int(len(latencias) * 0.99))] * 1000,
+        'errores': errores[0],
+    }
+
+
+def main(base_sync, base_async, concurrencia=200, peticiones=2000):
+    print(f"concurrencia={concurrencia} peticiones={peticiones}")
+    print(f"{'ruta':<14}{'modo':<7}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errores':>9}")
+    for ruta in RUTAS:
+        for modo, base in (('sync', base_sync), ('async', base_async)):
+            r = _medir(base, ruta, concurrencia, peticiones)
+            print(f"{ruta:<14}{modo:<7}{r['rps']:>10.1f}{r['p50']:>10.2f}{r['p99']:>10.2f}{r['errores']:>9}")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3:
+        sys.exit(__doc__)
+    main(sys.argv[1], sys.argv[2], *[int(a) for a in sys.argv[3:5]])
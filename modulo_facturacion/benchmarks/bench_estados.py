@@ -0,0 +1,87 @@
+"""
+Estado de cuenta de un mes para un cliente con mucha historia: saldo calculado
+recorriendo todas sus facturas contra saldo tomado de saldos_clientes más las
+facturas del periodo.
+
+Crea un cliente de prueba con `facturas` facturas repartidas en `dias` días
+hacia atrás, mide y lo borra al terminar.
+
+Uso (desde modulo_facturacion/): python benchmarks/bench_estados.py [facturas] [dias] [iteraciones]
+"""
+import datetime
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import estados  # noqa: E402
+from db import get_db_connection  # noqa: E402
+from fabrica import configurar_desde_entorno  # noqa: E402
+
+# Saldo de cada factura con una suma acumulada sobre toda la historia del cliente
+_INGENUA = (
+    'SELECT id, numero, fecha, total, saldo FROM ('
+    '  SELECT id, numero, fecha, total, sum(total) OVER (ORDER BY fecha, id) AS saldo'
+    '  FROM facturas WHERE cliente_id = %s'
+    ') t WHERE fecha >= %s AND fecha < %s ORDER BY fecha, id;'
+)
+
+
+def _medir(funcion, iteraciones):
+    inicio = time.perf_counter()
+    for _ in range(iteraciones):
+        funcion()
+    return (time.perf_counter() - inicio) / iteraciones * 1000
+
+
+def main(facturas=200000, dias=3650, iteraciones=50):
+    conn = get_db_connection()
+    cur = conn.cursor()
+    cur.execute(
+        "INSERT INTO clientes (nombre, direccion, telefono, email) "
+        "VALUES ('Cliente bench estados', '-', '-', 'bench-estados-' || md5(random()::text) || '@example.com') "
+        "RETURNING id;"
+    )
+    cliente_id = cur.fetchone()[0]
+    cur.execute(
+        "INSERT INTO facturas (numero, cliente_id, total, fecha) "
+        "SELECT 'BENCH-' || %s || '-' || g, %s, round((random() * 500)::numeric, 2), "
+        "       now() - (random() * %s || ' days')::interval "
+        "FROM generate_series(1, %s) g;",
+        (cliente_id, cliente_id, dias, facturas)
+    )
+    estados.recalcular(cur, cliente_id)
+    conn.commit()
+    cur.execute('ANALYZE facturas; ANALYZE saldos_clientes;')
+
+    try:
+        desde, hasta = estados.periodo()
+        fin = hasta + datetime.timedelta(days=1)
+
+        def ingenua():
+            cur.execute(_INGENUA, (cliente_id, desde, fin))
+            return cur.fetchall()
+
+        def con_saldos():
+            return estados.estado_de_cuenta(cur, cliente_id, desde, hasta)
+
+        a, b = ingenua(), con_saldos()
+        assert len(a) == len(b.movimientos) and (not a or a[-1][4] == b.saldo_final), "los saldos no coinciden"
+
+        print(f"cliente con {facturas} facturas en {dias} días; periodo {desde} a {hasta} ({len(a)} facturas)")
+        print(f"{'historia completa':<22}{_medir(ingenua, iteraciones):>10.2f} ms")
+        print(f"{'saldos + periodo':<22}{_medir(con_saldos, iteraciones):>10.2f} ms")
+    finally:
+        conn.rollback()
+        cur.execute('DELETE FROM saldos_clientes WHERE cliente_id = %s;', (cliente_id,))
+        cur.execute('DELETE FROM facturas WHERE cliente_id = %s;', (cliente_id,))
+        cur.execute('DELETE FROM clientes WHERE id = %s;', (cliente_id,))
+        conn.commit()
+        cur.close()
+        conn.close()
+
+
+if __name__ == '__main__':
+    configurar_desde_entorno()
+    main(*(int(a) for a in sys.argv[1:4]))
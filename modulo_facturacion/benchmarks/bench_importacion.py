@@ -0,0 +1,46 @@
+"""
+Mide la importación masiva de productos con un CSV generado de N filas
+(por defecto 100.000), con un 1 % de filas inválidas. La importación se
+deshace al final (confirmar=False), así que no modifica el catálogo.
+
+Uso (desde modulo_facturacion/): python benchmarks/bench_importacion.py [filas]
+"""
+import io
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db import get_db_connection  # noqa: E402
+from fabrica import configurar_desde_entorno  # noqa: E402
+from importacion import importar  # noqa: E402
+
+
+def _csv(filas):
+    rng = random.Random(42)
+    salida = io.StringIO()
+    salida.write('nombre,descripcion,precio\n')
+    for i in range(filas):
+        precio = f"{rng.uniform(1, 1000):.2f}" if rng.random() > 0.01 else 'n/a'
+        salida.write(f'"Producto importado {i}","Descripción del producto {i}",{precio}\n')
+    return io.BytesIO(salida.getvalue().encode('utf-8'))
+
+
+def main(filas=100000):
+    archivo = _csv(filas)
+    conn = get_db_connection()
+    try:
+        inicio = time.perf_counter()
+        resultado = importar(conn, 'productos', archivo, confirmar=False)
+        duracion = time.perf_counter() - inicio
+    finally:
+        conn.close()
+    print(f"filas={filas} segundos={duracion:.2f} filas/s={filas / duracion:.0f}")
+    print({k: v for k, v in resultado.items() if k != 'detalle_rechazos'})
+
+
+if __name__ == '__main__':
+    configurar_desde_entorno()
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
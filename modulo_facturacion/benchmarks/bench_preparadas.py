@@ -0,0 +1,84 @@
+"""
+Compara las consultas calientes ejecutadas con texto SQL contra las mismas
+ejecutadas como sentencias preparadas, y muestra el tiempo de planificación
+que PostgreSQL se ahorra en cada ejecución.
+
+Uso (desde modulo_facturacion/): python benchmarks/bench_preparadas.py [iteraciones]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db import get_db_connection  # noqa: E402
+from fabrica import configurar_desde_entorno  # noqa: E402
+from preparadas import SENTENCIAS, ejecutar  # noqa: E402
+
+# Consultas de lectura a medir y cómo obtener sus parámetros
+CASOS = ('precios_productos', 'factura_cabecera', 'factura_items', 'listar_facturas', 'opciones_productos')
+
+
+def _parametros(cur):
+    cur.execute('SELECT id FROM productos ORDER BY id LIMIT 5;')
+    productos = [row[0] for row in cur.fetchall()]
+    cur.execute('SELECT id FROM facturas ORDER BY id LIMIT 1;')
+    row = cur.fetchone()
+    factura_id = row[0] if row else 0
+    return {
+        'precios_productos': (productos,),
+        'factura_cabecera': (factura_id,),
+        'factura_items': (factura_id,),
+        'listar_facturas': (),
+        'opciones_productos': (),
+    }
+
+
+def _sql_texto(nombre, n_params):
+    # Misma consulta, con %s en lugar de $n, para enviarla sin preparar
+    sql = SENTENCIAS[nombre][0]
+    for i in range(n_params, 0, -1):
+        sql = sql.replace(f'${i}', '%s')
+    return sql
+
+
+def _planificacion_ms(cur, sql, params):
+    cur.execute('EXPLAIN (ANALYZE, SUMMARY, FORMAT JSON) ' + sql, params)
+    return cur.fetchone()[0][0]['Planning Time']
+
+
+def main(iteraciones=2000):
+    conn = get_db_connection()
+    conn.autocommit = True
+    cur = conn.cursor()
+    parametros = _parametros(cur)
+
+    print(f"{'consulta':<22}{'texto ms/op':>14}{'preparada ms/op':>18}{'plan ms':>10}")
+    for nombre in CASOS:
+        params = parametros[nombre]
+        sql = _sql_texto(nombre, len(params))
+
+        inicio = time.perf_counter()
+        for _ in range(iteraciones):
+            cur.execute(sql, params)
+            cur.fetchall()
+        texto = (time.perf_counter() - inicio) * 1000 / iteraciones
+
+        ejecutar(cur, nombre, params)  # preparar fuera de la medición
+        cur.fetchall()
+        inicio = time.perf_counter()
+        for _ in range(iteraciones):
+            ejecutar(cur, nombre, params)
+            cur.fetchall()
+        preparada = (time.perf_counter() - inicio) * 1000 / iteraciones
+
+        plan = _planificacion_ms(cur, sql, params)
+        print(f"{nombre:<22}{texto:>14.4f}{preparada:>18.4f}{plan:>10.4f}")
+
+    cur.close()
+    conn.close()
+
+
+if __name__ == '__main__':
+    configurar_desde_entorno()
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,98 @@
+"""
+Contención de la reserva de stock: muchos escritores concurrentes reservando
+sobre unos pocos productos "calientes". Cada transacción pide los productos en
+orden aleatorio; reservar_stock los bloquea siempre por id, así que no deberían
+aparecer deadlocks. Reporta transacciones/s, latencias y errores.
+
+Uso (desde modulo_facturacion/):
+    python benchmarks/bench_stock.py [escritores] [transacciones_por_escritor] [productos_calientes]
+"""
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from psycopg2 import errors as pg_errors  # noqa: E402
+
+from db import get_db_connection  # noqa: E402
+from fabrica import configurar_desde_entorno  # noqa: E402
+from inventario import StockInsuficiente, reservar_stock  # noqa: E402
+
+
+def _escritor(productos, transacciones, latencias, contadores, lock):
+    conn = get_db_connection()
+    cur = conn.cursor()
+    rng = random.Random()
+    for _ in range(transacciones):
+        pedido = rng.sample(productos, rng.randint(1, len(productos)))
+        cantidades = {pid: rng.randint(1, 3) for pid in pedido}
+        inicio = time.perf_counter()
+        resultado = 'ok'
+        try:
+            reservar_stock(cur, cantidades)
+            conn.commit()
+        except StockInsuficiente:
+            conn.rollback()
+            resultado = 'sin_stock'
+        except pg_errors.DeadlockDetected:
+            conn.rollback()
+            resultado = 'deadlock'
+        duracion = time.perf_counter() - inicio
+        with lock:
+            latencias.append(duracion)
+            contadores[resultado] = contadores.get(resultado, 0) + 1
+    cur.close()
+    conn.close()
+
+
+def _percentil(valores, p):
+    return valores[min(len(valores) - 1, int(len(valores) * p / 100))]
+
+
+def main(escritores=32, transacciones=200, calientes=3):
+    conn = get_db_connection()
+    cur = conn.cursor()
+    cur.execute('SELECT id FROM productos ORDER BY id LIMIT %s;', (calientes,))
+    productos = [row[0] for row in cur.fetchall()]
+    # Stock de sobra para medir contención y no agotamiento; se restaura al final
+    cur.execute('SELECT id, stock FROM productos WHERE id = ANY(%s);', (productos,))
+    stock_original = cur.fetchall()
+    cur.execute('UPDATE productos SET stock = 1000000 WHERE id = ANY(%s);', (productos,))
+    conn.commit()
+
+    latencias, contadores, lock = [], {}, threading.Lock()
+    hilos = [
+        threading.Thread(target=_escritor, args=(productos, transacciones, latencias, contadores, lock))
+        for _ in range(escritores)
+    ]
+    inicio = time.perf_counter()
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    total = time.perf_counter() - inicio
+
+    for pid, stock in stock_original:
+        cur.execute('UPDATE productos SET stock = %s WHERE id = %s;', (stock, pid))
+    conn.commit()
+    cur.close()
+    conn.close()
+
+    latencias.sort()
+    print(f"escritores={escritores} transacciones={len(latencias)} productos_calientes={len(productos)}")
+    print(f"transacciones/s: {len(latencias) / total:.1f}")
+    print(f"latencia ms: media={statistics.mean(latencias) * 1000:.2f} "
+          f"p50={_percentil(latencias, 50) * 1000:.2f} "
+          f"p95={_percentil(latencias, 95) * 1000:.2f} "
+          f"p99={_percentil(latencias, 99) * 1000:.2f}")
+    print(f"resultados: {contadores}")
+
+
+if __name__ == '__main__':
+    configurar_desde_entorno()
+    args = [int(a) for a in sys.argv[1:4]]
+    main(*args)
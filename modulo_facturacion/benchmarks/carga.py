@@ -0,0 +1,335 @@
+"""
+Prueba de carga de extremo a extremo contra un servidor en marcha.
+
+Usuarios virtuales concurrentes recorren las rutas reales con una mezcla
+configurable de acciones:
+    listar  - listados de facturas, clientes y productos (con paginación)
+    ver     - detalle de una factura
+    crear   - nueva factura con N líneas
+    editar  - formulario y guardado de un producto
+Al final se escribe un JSON con el rendimiento global y p50/p95/p99 por ruta,
+para comparar corridas entre sí.
+
+Uso (desde modulo_facturacion/, con la app sirviendo en --url):
+    python benchmarks/carga.py --usuarios 50 --duracion 60 --mezcla listar=40,ver=35,crear=20,editar=5
+    python benchmarks/carga.py --sembrar-clientes 5000 --sembrar-productos 2000 ...
+    python benchmarks/carga.py comparar base.json nueva.json
+"""
+import argparse
+import datetime
+import http.client
+import json
+import random
+import re
+import statistics
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from html import unescape
+from urllib.parse import urlencode, urlsplit
+
+ACCIONES = ('listar', 'ver', 'crear', 'editar')
+MAX_LINEAS = 5  # filas del formulario de nueva factura
+
+
+class Cliente:
+    """Conexión HTTP persistente de un usuario virtual; reconecta si el servidor la cierra."""
+
+    def __init__(self, url):
+        partes = urlsplit(url)
+        self.host, self.port = partes.hostname, partes.port or 80
+        self.conn = None
+
+    def pedir(self, metodo, ruta, campos=None, archivo=None):
+        cuerpo, cabeceras = None, {}
+        if campos is not None:
+            cuerpo = urlencode(campos)
+            cabeceras['Content-Type'] = 'application/x-www-form-urlencoded'
+        if archivo is not None:
+            limite = uuid.uuid4().hex
+            nombre, contenido = archivo
+            cuerpo = (
+                f'--{limite}\r\nContent-Disposition: form-data; name="archivo"; filename="{nombre}"\r\n'
+                f'Content-Type: text/csv\r\n\r\n{contenido}\r\n--{limite}--\r\n'
+            ).encode('utf-8')
+            cabeceras['Content-Type'] = f'multipart/form-data; boundary={limite}'
+        for intento in range(2):
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+            try:
+                self.conn.request(metodo, ruta, body=cuerpo, headers=cabeceras)
+                respuesta = self.conn.getresponse()
+                datos = respuesta.read()
+                if respuesta.getheader('Connection', '').lower() == 'close':
+                    self.cerrar()
+                return respuesta.status, respuesta.getheader('Location', ''), datos.decode('utf-8', 'replace')
+            except (http.client.HTTPException, OSError):
+                self.cerrar()
+                if intento:
+                    raise
+
+    def cerrar(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+class Datos:
+    """Ids conocidos de clientes, productos y facturas, compartidos por los usuarios."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clientes, self.productos, self.facturas = [], [], []
+
+    def descubrir(self, cliente):
+        for ruta, patron, destino in (
+            ('/clientes', r'/clientes/(\d+)/editar', self.clientes),
+            ('/productos', r'/productos/editar/(\d+)', self.productos),
+            ('/facturas', r'/factura/(\d+)', self.facturas),
+        ):
+            pagina, vistos = 1, set(destino)
+            while True:
+                _, _, html = cliente.pedir('GET', f'{ruta}?pagina={pagina}')
+                nuevos = [i for i in dict.fromkeys(int(i) for i in re.findall(patron, html)) if i not in vistos]
+                destino.extend(nuevos)
+                vistos.update(nuevos)
+                # El servidor limita la página (listados.MAX_PAGINA) y repite la última
+                # con su enlace Siguiente: una página sin ids nuevos también termina
+                if ruta == '/facturas' or not nuevos or 'Siguiente</a>' not in html:
+                    break
+                pagina += 1
+
+    def agregar_factura(self, factura_id):
+        with self.lock:
+            self.facturas.append(factura_id)
+
+
+class Medidas:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencias = defaultdict(list)
+        self.errores = defaultdict(int)
+
+    def registrar(self, ruta, duracion, ok):
+        with self.lock:
+            self.latencias[ruta].append(duracion)
+            if not ok:
+                self.errores[ruta] += 1
+
+
+def _medir(medidas, etiqueta, cliente, metodo, ruta, campos=None, ok_status=(200,)):
+    inicio = time.perf_counter()
+    try:
+        status, location, html = cliente.pedir(metodo, ruta, campos)
+        ok = status in ok_status
+    except (http.client.HTTPException, OSError):
+        status, location, html, ok = None, '', '', False
+    medidas.registrar(etiqueta, time.perf_counter() - inicio, ok)
+    return status, location, html
+
+
+def _listar(rng, cliente, datos, medidas, opciones):
+    ruta = rng.choice(('/facturas', '/clientes', '/productos'))
+    if ruta != '/facturas' and rng.random() < 0.3:
+        _medir(medidas, f'GET {ruta}?pagina=N', cliente, 'GET', f'{ruta}?pagina={rng.randint(2, 5)}')
+    else:
+        _medir(medidas, f'GET {ruta}', cliente, 'GET', ruta)
+
+
+def _ver(rng, cliente, datos, medidas, opciones):
+    if not datos.facturas:
+        return _crear(rng, cliente, datos, medidas, opciones)
+    _medir(medidas, 'GET /factura/<id>', cliente, 'GET', f'/factura/{rng.choice(datos.facturas)}')
+
+
+def _crear(rng, cliente, datos, medidas, opciones):
+    _, _, html = _medir(medidas, 'GET /factura/nueva', cliente, 'GET', '/factura/nueva')
+    clave = re.search(r'name="idempotency_key" value="(\w+)"', html)
+    campos = {'cliente_id': rng.choice(datos.clientes)}
+    if clave:
+        campos['idempotency_key'] = clave.group(1)
+    for i, producto_id in enumerate(rng.sample(datos.productos, min(opciones.lineas, len(datos.productos))), 1):
+        campos[f'producto_id_{i}'] = producto_id
+        campos[f'cantidad_{i}'] = rng.randint(1, 3)
+    status, location, _ = _medir(medidas, 'POST /factura/nueva', cliente, 'POST', '/factura/nueva',
+                                 campos, ok_status=(302, 303))
+    encontrado = re.search(r'/factura/(\d+)', location or '')
+    if encontrado:
+        datos.agregar_factura(int(encontrado.group(1)))
+
+
+def _editar(rng, cliente, datos, medidas, opciones):
+    producto_id = rng.choice(datos.productos)
+    _, _, html = _medir(medidas, 'GET /productos/editar/<id>', cliente, 'GET', f'/productos/editar/{producto_id}')
+    nombre = re.search(r'name="nombre" value="([^"]*)"', html)
+    descripcion = re.search(r'name="descripcion"[^>]*>([^<]*)</textarea>', html)
+    precio = re.search(r'name="precio" value="([^"]*)"', html)
+    if not (nombre and descripcion and precio):
+        return
+    nuevo_precio = max(0.01, float(precio.group(1)) * rng.uniform(0.98, 1.02))
+    _medir(medidas, 'POST /productos/editar/<id>', cliente, 'POST', f'/productos/editar/{producto_id}',
+           {'nombre': unescape(nombre.group(1)), 'descripcion': unescape(descripcion.group(1)),
+            'precio': f'{nuevo_precio:.2f}'},
+           ok_status=(302, 303))
+
+
+_FUNCIONES = {'listar': _listar, 'ver': _ver, 'crear': _crear, 'editar': _editar}
+
+
+def _usuario(n, opciones, datos, medidas, fin):
+    rng = random.Random(None if opciones.semilla is None else opciones.semilla + n)
+    cliente = Cliente(opciones.url)
+    acciones = list(opciones.mezcla)
+    pesos = [opciones.mezcla[a] for a in acciones]
+    try:
+        while time.perf_counter() < fin:
+            _FUNCIONES[rng.choices(acciones, pesos)[0]](rng, cliente, datos, medidas, opciones)
+            if opciones.pausa:
+                time.sleep(rng.expovariate(1 / opciones.pausa))
+    finally:
+        cliente.cerrar()
+
+
+def _sembrar(url, clientes, productos):
+    """Carga clientes y productos de prueba con la importación CSV de la propia app."""
+    cliente = Cliente(url)
+    marca = uuid.uuid4().hex[:8]
+    if clientes:
+        filas = ''.join(f'Cliente carga {marca}-{i},Calle {i},555-{i:04d},carga-{marca}-{i}@example.com\n'
+                        for i in range(clientes))
+        status, _, cuerpo = cliente.pedir('POST', '/clientes/importar',
+                                          archivo=('clientes.csv', 'nombre,direccion,telefono,email\n' + filas))
+        print(f"sembrar clientes: {status} {cuerpo[:200]}")
+    if productos:
+        filas = ''.join(f'Producto carga {marca}-{i},Producto de prueba,{random.uniform(1, 500):.2f}\n'
+                        for i in range(productos))
+        status, _, cuerpo = cliente.pedir('POST', '/productos/importar',
+                                          archivo=('productos.csv', 'nombre,descripcion,precio\n' + filas))
+        print(f"sembrar productos: {status} {cuerpo[:200]}")
+    cliente.cerrar()
+
+
+def _percentil(ordenadas, p):
+    return ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * p / 100))]
+
+
+def _informe(medidas, duracion, opciones):
+    rutas = {}
+    total = 0
+    for ruta, latencias in sorted(medidas.latencias.items()):
+        ordenadas = sorted(latencias)
+        total += len(ordenadas)
+        rutas[ruta] = {
+            'peticiones': len(ordenadas),
+            'errores': medidas.errores[ruta],
+            'rps': len(ordenadas) / duracion,
+            'media_ms': statistics.mean(ordenadas) * 1000,
+            'p50_ms': _percentil(ordenadas, 50) * 1000,
+            'p95_ms': _percentil(ordenadas, 95) * 1000,
+            'p99_ms': _percentil(ordenadas, 99) * 1000,
+            'max_ms': ordenadas[-1] * 1000,
+        }
+    creadas = rutas.get('POST /factura/nueva', {})
+    return {
+        'fecha': datetime.datetime.now().isoformat(timespec='seconds'),
+        'configuracion': {
+            'url': opciones.url, 'usuarios': opciones.usuarios, 'duracion_s': opciones.duracion,
+            'mezcla': opciones.mezcla, 'lineas': opciones.lineas, 'pausa_s': opciones.pausa,
+        },
+        'duracion_real_s': duracion,
+        'peticiones': total,
+        'rps': total / duracion,
+        'facturas_por_segundo': (creadas.get('peticiones', 0) - creadas.get('errores', 0)) / duracion,
+        'rutas': rutas,
+    }
+
+
+def _imprimir(informe):
+    print(f"{'ruta':<32}{'peticiones':>11}{'errores':>9}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for ruta, r in informe['rutas'].items():
+        print(f"{ruta:<32}{r['peticiones']:>11}{r['errores']:>9}{r['rps']:>9.1f}"
+              f"{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}{r['p99_ms']:>9.1f}")
+    print(f"total: {informe['peticiones']} peticiones, {informe['rps']:.1f} req/s, "
+          f"{informe['facturas_por_segundo']:.1f} facturas/s")
+
+
+def comparar(base, nueva):
+    """Diferencias de rendimiento y p99 por ruta entre dos informes JSON."""
+    with open(base, encoding='utf-8') as f:
+        a = json.load(f)
+    with open(nueva, encoding='utf-8') as f:
+        b = json.load(f)
+    print(f"{'ruta':<32}{'req/s':>18}{'p99 ms':>22}")
+    for ruta in sorted(set(a['rutas']) | set(b['rutas'])):
+        ra, rb = a['rutas'].get(ruta), b['rutas'].get(ruta)
+        if not ra or not rb:
+            print(f"{ruta:<32}{'(solo en una corrida)':>40}")
+            continue
+        print(f"{ruta:<32}{ra['rps']:>8.1f} -> {rb['rps']:<7.1f}{ra['p99_ms']:>10.1f} -> {rb['p99_ms']:<9.1f}")
+    print(f"{'total':<32}{a['rps']:>8.1f} -> {b['rps']:<7.1f}")
+
+
+def _mezcla(texto):
+    mezcla = {}
+    for parte in texto.split(','):
+        accion, _, peso = parte.partition('=')
+        accion = accion.strip()
+        if accion not in ACCIONES:
+            raise argparse.ArgumentTypeError(f"acción desconocida: {accion}")
+        mezcla[accion] = float(peso or 1)
+    return mezcla
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ['comparar']:
+        if len(argv) != 3:
+            sys.exit("Uso: carga.py comparar base.json nueva.json")
+        return comparar(argv[1], argv[2])
+
+    parser = argparse.ArgumentParser(description="Prueba de carga con mezcla realista de tráfico")
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--usuarios', type=int, default=20)
+    parser.add_argument('--duracion', type=float, default=30, help="segundos")
+    parser.add_argument('--mezcla', type=_mezcla, default=_mezcla('listar=40,ver=35,crear=20,editar=5'))
+    parser.add_argument('--lineas', type=int, default=3, help=f"líneas por factura (máx. {MAX_LINEAS})")
+    parser.add_argument('--pausa', type=float, default=0, help="pausa media entre acciones, en segundos")
+    parser.add_argument('--semilla', type=int, default=None)
+    parser.add_argument('--sembrar-clientes', type=int, default=0)
+    parser.add_argument('--sembrar-productos', type=int, default=0)
+    parser.add_argument('--salida', default=None, help="archivo JSON del informe")
+    opciones = parser.parse_args(argv)
+    opciones.lineas = max(1, min(opciones.lineas, MAX_LINEAS))
+
+    if opciones.sembrar_clientes or opciones.sembrar_productos:
+        _sembrar(opciones.url, opciones.sembrar_clientes, opciones.sembrar_productos)
+
+    datos = Datos()
+    cliente = Cliente(opciones.url)
+    datos.descubrir(cliente)
+    cliente.cerrar()
+    if not datos.clientes or not datos.productos:
+        sys.exit("No hay clientes o productos: use --sembrar-clientes / --sembrar-productos")
+
+    medidas = Medidas()
+    inicio = time.perf_counter()
+    fin = inicio + opciones.duracion
+    hilos = [threading.Thread(target=_usuario, args=(n, opciones, datos, medidas, fin))
+             for n in range(opciones.usuarios)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    informe = _informe(medidas, time.perf_counter() - inicio, opciones)
+
+    _imprimir(informe)
+    salida = opciones.salida or f"carga-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    with open(salida, 'w', encoding='utf-8') as f:
+        json.dump(informe, f, indent=2, ensure_ascii=False)
+    print(f"informe: {salida}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""
+Caché en memoria de clientes y productos, invalidada entre procesos con
+LISTEN/NOTIFY de PostgreSQL.
+
+Las rutas que escriben llaman a `publicar()` dentro de su transacción; el
+NOTIFY solo se entrega si la transacción confirma. Cada proceso mantiene un
+hilo que escucha el canal y desaloja las claves afectadas. Mientras el hilo no
+está conectado la caché no sirve nada, y al (re)conectarse se vacía entera,
+porque los avisos emitidos durante la desconexión se pierden.
+"""
+import logging
+import os
+import select
+import threading
+import time
+
+import psycopg2
+from psycopg2 import extensions
+
+from db import DB_CONFIG
+
+CANAL = 'invalidacion_cache'
+ESPERA_RECONEXION = 1.0
+ESPERA_RECONEXION_MAX = 30.0
+
+logger = logging.getLogger(__name__)
+
+_datos = {}
+# Aumenta con cada desalojo: un valor cargado mientras llegaba un aviso no se guarda
+_generacion = 0
+_lock = threading.Lock()
+_escuchando = threading.Event()
+_hilo_pid = None
+
+
+def obtener(entidad, clave, cargar):
+    """
+    Devuelve el valor cacheado para (entidad, clave) o lo calcula con `cargar()`.
+    `clave` None representa los listados completos de la entidad.
+    """
+    _iniciar_escucha()
+    if not _escuchando.is_set():
+        return cargar()
+    with _lock:
+        if (entidad, clave) in _datos:
+            return _datos[(entidad, clave)]
+        generacion = _generacion
+    valor = cargar()
+    with _lock:
+        if generacion == _generacion and _escuchando.is_set():
+            _datos[(entidad, clave)] = valor
+    return valor
+
+
+def invalidar(entidad, clave=None):
+    """Desaloja (entidad, clave) y los listados de la entidad."""
+    global _generacion
+    with _lock:
+        _generacion += 1
+        _datos.pop((entidad, clave), None)
+        _datos.pop((entidad, None), None)
+
+
+def vaciar():
+    global _generacion
+    with _lock:
+        _generacion += 1
+        _datos.clear()
+
+
+def publicar(cur, entidad, clave=None):
+    """
+    Anuncia un cambio en (entidad, clave) a todos los procesos al confirmar la
+    transacción de `cur`. También desaloja ya la copia local.
+    """
+    carga = entidad if clave is None else f"{entidad}:{clave}"
+    cur.execute('SELECT pg_notify(%s, %s);', (CANAL, carga))
+    invalidar(entidad, clave)
+
+
+def _procesar(carga):
+    entidad, _, clave = carga.partition(':')
+    if not clave:
+        invalidar(entidad)
+    elif clave.isdigit():
+        invalidar(entidad, int(clave))
+    else:
+        invalidar(entidad, clave)
+
+
+def _escuchar():
+    espera = ESPERA_RECONEXION
+    while True:
+        conn = None
+        try:
+            conn = psycopg2.connect(**DB_CONFIG)
+            conn.set_isolation_level(extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+            cur = conn.cursor()
+            cur.execute(f'LISTEN {CANAL};')
+            # Lo cacheado antes de escuchar pudo perder avisos
+            vaciar()
+            _escuchando.set()
+            espera = ESPERA_RECONEXION
+            while True:
+                if select.select([conn], [], [], 60) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    _procesar(conn.notifies.pop(0).payload)
+        except Exception:
+            logger.error("Escucha de invalidación de caché interrumpida", exc_info=True)
+        finally:
+            _escuchando.clear()
+            vaciar()
+            if conn is not None:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+        time.sleep(espera)
+        espera = min(espera * 2, ESPERA_RECONEXION_MAX)
+
+
+def _iniciar_escucha():
+    # Un hilo por proceso; tras un fork el hilo del padre no existe en el hijo
+    global _hilo_pid
+    if _hilo_pid == os.getpid():
+        return
+    with _lock:
+        if _hilo_pid == os.getpid():
+            return
+        _hilo_pid = os.getpid()
+        _escuchando.clear()
+        _datos.clear()
+    threading.Thread(target=_escuchar, name='escucha-cache', daemon=True).start()
@@ -0,0 +1,82 @@
+import threading
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import extensions, pool
+
+# Configuración de la base de datos
+DB_CONFIG = {
+    'host': 'localhost',
+    'database': 'facturacion_db',
+    'user': 'postgres',
+    'password': 'alumno'
+}
+
+# Tamaño del pool de conexiones por proceso
+POOL_MIN = 1
+POOL_MAX = 10
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+class Conexion(extensions.connection):
+    """
+    Conexión psycopg2 que recuerda qué sentencias preparadas existen en su sesión.
+    `preparadas` es None cuando el estado del servidor es desconocido y hay que limpiarlo.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.preparadas = set()
+
+
+def configurar(config, pool_min=POOL_MIN, pool_max=POOL_MAX):
+    """
+    Fija la configuración de conexión del proceso. Se modifica DB_CONFIG en su
+    lugar porque otros módulos lo importan; un pool ya creado se descarta.
+    """
+    global POOL_MIN, POOL_MAX, _pool
+    with _pool_lock:
+        DB_CONFIG.clear()
+        DB_CONFIG.update(config)
+        POOL_MIN, POOL_MAX = pool_min, pool_max
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+
+
+def get_db_connection():
+    """Conexión suelta, fuera del pool (scripts y tareas largas)."""
+    return psycopg2.connect(connection_factory=Conexion, **DB_CONFIG)
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = pool.ThreadedConnectionPool(
+                    POOL_MIN, POOL_MAX, connection_factory=Conexion, **DB_CONFIG
+                )
+    return _pool
+
+
+@contextmanager
+def conexion():
+    """
+    Presta una conexión del pool y la devuelve al salir.
+    No hace commit: cada ruta confirma explícitamente. Una transacción abierta
+    se descarta y una conexión rota se cierra (el pool abrirá una nueva).
+    """
+    p = get_pool()
+    conn = p.getconn()
+    try:
+        yield conn
+    finally:
+        try:
+            if not conn.closed and conn.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+        except psycopg2.Error:
+            pass
+        p.putconn(conn, close=bool(conn.closed))
@@ -0,0 +1,161 @@
+"""
+Estados de cuenta por cliente con saldos precalculados.
+
+La tabla saldos_clientes guarda, por cliente y día con facturas, cuántas se
+emitieron, su importe y el saldo acumulado al cierre de ese día. Cada
+transacción que crea facturas llama a acumular() antes del commit, de modo que
+el saldo anterior a cualquier fecha es una sola búsqueda por índice y un estado
+de cuenta solo recorre las facturas del periodo pedido.
+
+Si los saldos se desalinean (carga directa en la base, restauración parcial)
+se reconstruyen con: python estados.py --recalcular [--cliente N]
+"""
+import argparse
+import datetime
+from collections import namedtuple
+from decimal import Decimal
+
+from db import get_db_connection
+from preparadas import ejecutar, registrar
+
+# Clase de los bloqueos consultivos (pg_advisory_xact_lock(clase, cliente_id))
+_CLASE_BLOQUEO = 7301
+
+# Serializa por cliente la actualización de sus saldos: quien llega segundo ve
+# las filas del primero aunque sus facturas caigan en días distintos.
+registrar('bloquear_saldos',
+          'SELECT pg_advisory_xact_lock($1, c) FROM unnest($2::integer[]) AS c ORDER BY c',
+          ('integer', 'integer[]'))
+# Suma las facturas nuevas al día de su fecha y a los acumulados de días
+# posteriores (solo existen si una transacción cruzó la medianoche).
+registrar('acumular_saldos',
+          'WITH nuevas AS ('
+          '  SELECT cliente_id, fecha::date AS dia, count(*) AS facturas, sum(total) AS importe'
+          '  FROM facturas WHERE id = ANY($1) GROUP BY cliente_id, fecha::date'
+          '), posteriores AS ('
+          '  UPDATE saldos_clientes s SET acumulado = s.acumulado + n.importe'
+          '  FROM nuevas n WHERE s.cliente_id = n.cliente_id AND s.dia > n.dia'
+          ') '
+          'INSERT INTO saldos_clientes AS s (cliente_id, dia, facturas, importe, acumulado) '
+          'SELECT n.cliente_id, n.dia, n.facturas, n.importe, n.importe + COALESCE(('
+          '  SELECT p.acumulado FROM saldos_clientes p'
+          '  WHERE p.cliente_id = n.cliente_id AND p.dia < n.dia ORDER BY p.dia DESC LIMIT 1'
+          '), 0) FROM nuevas n '
+          'ON CONFLICT (cliente_id, dia) DO UPDATE SET facturas = s.facturas + EXCLUDED.facturas, '
+          'importe = s.importe + EXCLUDED.importe, acumulado = s.acumulado + EXCLUDED.importe',
+          ('integer[]',))
+registrar('saldo_anterior',
+          'SELECT acumulado FROM saldos_clientes WHERE cliente_id = $1 AND dia < $2 '
+          'ORDER BY dia DESC LIMIT 1',
+          ('integer', 'date'))
+registrar('movimientos_cliente',
+          'SELECT id, numero, fecha, total FROM facturas '
+          'WHERE cliente_id = $1 AND fecha >= $2 AND fecha < $3 ORDER BY fecha, id',
+          ('integer', 'date', 'date'))
+registrar('cliente_estado', 'SELECT id, nombre, direccion, telefono, email FROM clientes WHERE id = $1',
+          ('integer',))
+
+Estado = namedtuple('Estado', 'cliente desde hasta saldo_inicial movimientos total saldo_final')
+Movimiento = namedtuple('Movimiento', 'factura_id numero fecha importe saldo')
+
+
+def acumular(cur, facturas):
+    """
+    Suma las facturas [(factura_id, cliente_id)], ya insertadas en la transacción
+    de `cur`, a los saldos de sus clientes. Debe llamarse justo antes del commit:
+    el bloqueo por cliente se mantiene hasta el final de la transacción.
+    """
+    if not facturas:
+        return
+    ejecutar(cur, 'bloquear_saldos', (_CLASE_BLOQUEO, sorted({cliente_id for _, cliente_id in facturas})))
+    ejecutar(cur, 'acumular_saldos', ([factura_id for factura_id, _ in facturas],))
+
+
+def periodo(desde=None, hasta=None):
+    """Fechas del estado de cuenta; por defecto, del primer día del mes a hoy."""
+    hoy = datetime.date.today()
+    hasta = hasta or hoy
+    desde = desde or hasta.replace(day=1)
+    if desde > hasta:
+        raise ValueError("La fecha inicial es posterior a la final.")
+    # estado_de_cuenta() consulta hasta el día siguiente a `hasta`
+    if hasta >= datetime.date.max:
+        raise ValueError("La fecha final está fuera de rango.")
+    return desde, hasta
+
+
+def estado_de_cuenta(cur, cliente_id, desde, hasta):
+    """Estado de cuenta de `cliente_id` entre `desde` y `hasta` (ambos inclusive), o None si no existe."""
+    ejecutar(cur, 'cliente_estado', (cliente_id,))
+    cliente = cur.fetchone()
+    if cliente is None:
+        return None
+
+    ejecutar(cur, 'saldo_anterior', (cliente_id, desde))
+    fila = cur.fetchone()
+    saldo = saldo_inicial = fila[0] if fila else Decimal('0.00')
+
+    ejecutar(cur, 'movimientos_cliente', (cliente_id, desde, hasta + datetime.timedelta(days=1)))
+    movimientos = []
+    for factura_id, numero, fecha, importe in cur.fetchall():
+        saldo += importe
+        movimientos.append(Movimiento(factura_id, numero, fecha, importe, saldo))
+
+    return Estado(cliente, desde, hasta, saldo_inicial, movimientos, saldo - saldo_inicial, saldo)
+
+
+def como_dict(estado):
+    """Estado de cuenta serializable a JSON (importes como texto para no perder decimales)."""
+    return {
+        'cliente': {'id': estado.cliente[0], 'nombre': estado.cliente[1], 'email': estado.cliente[4]},
+        'desde': estado.desde.isoformat(),
+        'hasta': estado.hasta.isoformat(),
+        'saldo_inicial': str(estado.saldo_inicial),
+        'movimientos': [
+            {'factura_id': m.factura_id, 'numero': m.numero, 'fecha': m.fecha.isoformat(),
+             'importe': str(m.importe), 'saldo': str(m.saldo)}
+            for m in estado.movimientos
+        ],
+        'total': str(estado.total),
+        'saldo_final': str(estado.saldo_final),
+    }
+
+
+def recalcular(cur, cliente_id=None):
+    """
+    Reconstruye los saldos desde facturas (de un cliente o de todos). Bloquea la
+    escritura de saldos mientras tanto; las lecturas siguen funcionando.
+    """
+    cur.execute('LOCK TABLE saldos_clientes IN EXCLUSIVE MODE;')
+    filtro = 'WHERE cliente_id = %(cliente)s' if cliente_id is not None else ''
+    cur.execute(f'DELETE FROM saldos_clientes {filtro};', {'cliente': cliente_id})
+    cur.execute(
+        'INSERT INTO saldos_clientes (cliente_id, dia, facturas, importe, acumulado) '
+        'SELECT cliente_id, dia, facturas, importe, '
+        '       sum(importe) OVER (PARTITION BY cliente_id ORDER BY dia) '
+        'FROM (SELECT cliente_id, fecha::date AS dia, count(*) AS facturas, sum(total) AS importe '
+        f'      FROM facturas {filtro} GROUP BY cliente_id, fecha::date) d;',
+        {'cliente': cliente_id}
+    )
+    return cur.rowcount
+
+
+if __name__ == '__main__':
+    from fabrica import configurar_desde_entorno
+
+    parser = argparse.ArgumentParser(description="Mantenimiento de los saldos de clientes")
+    parser.add_argument('--recalcular', action='store_true', help="reconstruir saldos desde facturas")
+    parser.add_argument('--cliente', type=int, default=None)
+    args = parser.parse_args()
+    configurar_desde_entorno()
+    if not args.recalcular:
+        parser.error("Indique --recalcular")
+    conn = get_db_connection()
+    try:
+        cur = conn.cursor()
+        filas = recalcular(cur, args.cliente)
+        conn.commit()
+        cur.close()
+    finally:
+        conn.close()
+    print(f"Saldos recalculados: {filas} días con facturas")
@@ -0,0 +1,109 @@
+"""
+Fábrica de la aplicación.
+
+create_app() solo arma la configuración y registra blueprints: el pool de
+conexiones, las sentencias preparadas y el hilo de la caché se inician con la
+primera petición que los usa. Las plantillas compiladas se guardan en disco
+(bytecode de Jinja) para que los procesos nuevos no vuelvan a compilarlas.
+
+Configuración por proceso: el dict `config`, o variables de entorno con
+prefijo FACTURACION_ (p. ej. FACTURACION_DB_CONFIG__host=db1,
+FACTURACION_INVENTARIO_ACTIVO=true, FACTURACION_PERFIL_MUESTREO=0.01). Los
+scripts de línea de comandos leen las mismas variables con
+configurar_desde_entorno().
+"""
+import logging
+import os
+import time
+
+from flask import Config, Flask
+from jinja2 import FileSystemBytecodeCache
+
+import db
+
+# Instante en que el proceso cargó la aplicación, para medir la primera respuesta
+_INICIO = time.perf_counter()
+
+
+def _reiniciar_inicio():
+    global _INICIO
+    _INICIO = time.perf_counter()
+
+
+# Con gunicorn --preload cada worker se cuenta desde su fork
+os.register_at_fork(after_in_child=_reiniciar_inicio)
+
+DEFAULTS = {
+    'DB_CONFIG': dict(db.DB_CONFIG),
+    'POOL_MIN': db.POOL_MIN,
+    'POOL_MAX': db.POOL_MAX,
+    # Control de inventario: al activarlo, cada factura descuenta productos.stock
+    'INVENTARIO_ACTIVO': False,
+    # Directorio del bytecode de Jinja; None usa el directorio temporal del sistema
+    'PLANTILLAS_CACHE_DIR': None,
+    # Perfilador: cabecera con este token o muestreo al azar (0 desactiva)
+    'PERFIL_TOKEN': '',
+    'PERFIL_MUESTREO': 0,
+    'PERFIL_DIR': 'perfiles',
+}
+
+
+def cargar_configuracion(config=None):
+    """DEFAULTS, luego las variables de entorno FACTURACION_* y luego `config`."""
+    # Copia de DB_CONFIG: from_prefixed_env modifica los dicts anidados en su lugar
+    resultado = Config(os.path.dirname(os.path.abspath(__file__)))
+    resultado.from_mapping({**DEFAULTS, 'DB_CONFIG': dict(DEFAULTS['DB_CONFIG'])})
+    resultado.from_prefixed_env('FACTURACION')
+    if config:
+        resultado.from_mapping(config)
+    return resultado
+
+
+def configurar_desde_entorno():
+    """
+    Para los scripts de línea de comandos: conecta db como lo haría create_app()
+    con las mismas variables FACTURACION_* y devuelve la configuración.
+    """
+    config = cargar_configuracion()
+    db.configurar(config['DB_CONFIG'], config['POOL_MIN'], config['POOL_MAX'])
+    return config
+
+
+def create_app(config=None):
+    app = Flask(__name__)
+    app.config.update(cargar_configuracion(config))
+
+    app.logger.setLevel(logging.INFO)
+
+    db.configurar(app.config['DB_CONFIG'], app.config['POOL_MIN'], app.config['POOL_MAX'])
+
+    # Se aplica cuando Jinja crea su entorno, con el primer render
+    app.jinja_options = {
+        **app.jinja_options,
+        'bytecode_cache': FileSystemBytecodeCache(app.config['PLANTILLAS_CACHE_DIR']),
+    }
+
+    from perfilador import registrar_perfilador
+    from rutas_clientes import bp as clientes_bp
+    from rutas_facturas import bp as facturas_bp
+    from rutas_productos import bp as productos_bp
+
+    app.register_blueprint(facturas_bp)
+    app.register_blueprint(clientes_bp)
+    app.register_blueprint(productos_bp)
+    registrar_perfilador(app)
+    _registrar_primera_respuesta(app)
+    return app
+
+
+def _registrar_primera_respuesta(app):
+    # Tiempo desde el arranque del proceso hasta su primera respuesta, una vez por worker
+    estado = {'pid': None}
+
+    @app.after_request
+    def _primera_respuesta(respuesta):
+        if estado['pid'] != os.getpid():
+            estado['pid'] = os.getpid()
+            app.logger.info("Worker %s: primera respuesta a los %.1f ms del arranque",
+                            os.getpid(), (time.perf_counter() - _INICIO) * 1000)
+        return respuesta
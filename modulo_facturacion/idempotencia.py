@@ -0,0 +1,98 @@
+"""
+Claves de idempotencia para la creación de facturas.
+
+Un reintento con la misma clave (cabecera Idempotency-Key o campo oculto del
+formulario) recibe la redirección a la factura original sin volver a consultar
+precios ni gastar un número de la secuencia. Las claves viven en memoria (LRU
+por proceso) y en la tabla idempotencia, que se comparte entre procesos; ambas
+se conservan durante RETENCION.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from preparadas import ejecutar, registrar
+
+CABECERA = 'Idempotency-Key'
+CAMPO = 'idempotency_key'
+LONGITUD_MAX = 100
+RETENCION = 24 * 3600  # segundos
+MAX_MEMORIA = 10000
+# Cada cuántas claves nuevas (por proceso) se purgan las vencidas en la BD
+PURGAR_CADA = 1000
+
+# Si otra transacción está insertando la misma clave, el INSERT espera a que
+# termine: la petición duplicada concurrente ve la factura ya confirmada.
+# Una clave vencida (aún sin purgar) se reinicia y cuenta como nueva.
+registrar('reservar_clave',
+          'INSERT INTO idempotencia AS i (clave) VALUES ($1) ON CONFLICT (clave) DO UPDATE '
+          'SET factura_id = NULL, creada = EXCLUDED.creada '
+          'WHERE i.creada < now() - make_interval(secs => $2) RETURNING clave',
+          ('varchar', 'integer'))
+registrar('factura_de_clave', 'SELECT factura_id FROM idempotencia WHERE clave = $1', ('varchar',))
+registrar('completar_clave', 'UPDATE idempotencia SET factura_id = $2 WHERE clave = $1', ('varchar', 'integer'))
+registrar('purgar_claves',
+          "DELETE FROM idempotencia WHERE creada < now() - make_interval(secs => $1)",
+          ('integer',))
+
+_memoria = OrderedDict()  # clave -> (factura_id, instante)
+_lock = threading.Lock()
+_nuevas = 0
+
+
+class ClaveEnCurso(Exception):
+    """La clave existe pero no tiene factura asociada."""
+
+
+def clave_de(request):
+    clave = (request.headers.get(CABECERA) or request.form.get(CAMPO) or '').strip()
+    if not clave or len(clave) > LONGITUD_MAX:
+        return None
+    return clave
+
+
+def en_memoria(clave):
+    with _lock:
+        entrada = _memoria.get(clave)
+        if entrada is None:
+            return None
+        factura_id, instante = entrada
+        if time.monotonic() - instante > RETENCION:
+            del _memoria[clave]
+            return None
+        _memoria.move_to_end(clave)
+        return factura_id
+
+
+def recordar(clave, factura_id):
+    with _lock:
+        _memoria[clave] = (factura_id, time.monotonic())
+        _memoria.move_to_end(clave)
+        while len(_memoria) > MAX_MEMORIA:
+            _memoria.popitem(last=False)
+
+
+def reservar(cur, clave):
+    """
+    Reserva `clave` dentro de la transacción de `cur`. Devuelve None si es nueva
+    o vencida, o el id de la factura que ya se creó con ella.
+    """
+    ejecutar(cur, 'reservar_clave', (clave, RETENCION))
+    if cur.fetchone() is not None:
+        return None
+    ejecutar(cur, 'factura_de_clave', (clave,))
+    fila = cur.fetchone()
+    if fila is None or fila[0] is None:
+        raise ClaveEnCurso(clave)
+    return fila[0]
+
+
+def completar(cur, clave, factura_id):
+    """Asocia la factura a la clave; se confirma junto con la factura."""
+    global _nuevas
+    ejecutar(cur, 'completar_clave', (clave, factura_id))
+    with _lock:
+        _nuevas += 1
+        purgar = _nuevas % PURGAR_CADA == 0
+    if purgar:
+        ejecutar(cur, 'purgar_claves', (RETENCION,))
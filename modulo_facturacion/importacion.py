@@ -0,0 +1,252 @@
+"""
+Importación masiva del catálogo (clientes y productos) desde CSV.
+
+El archivo se recorre una vez con el módulo csv para apartar las filas con un
+número de columnas distinto al del encabezado (que harían fallar COPY), se
+vuelca con COPY a una tabla temporal, se valida en SQL y se
+inserta o actualiza en una sola sentencia por su clave natural (email para
+clientes, nombre para productos). Si una clave se repite en el archivo gana la
+última fila. Las filas sin cambios no se reescriben.
+
+Uso: python importacion.py clientes|productos archivo.csv [--validar]
+"""
+import argparse
+import csv
+import io
+import tempfile
+
+import psycopg2
+from flask import jsonify, request
+from psycopg2 import sql
+
+import cache
+from db import get_db_connection
+
+# Por entidad: columnas aceptadas (con su longitud máxima), obligatorias y clave natural
+ENTIDADES = {
+    'clientes': {
+        'columnas': {'nombre': 100, 'direccion': None, 'telefono': 20, 'email': 100},
+        'obligatorias': ('nombre', 'direccion', 'telefono', 'email'),
+        'clave': 'email',
+    },
+    'productos': {
+        'columnas': {'nombre': 100, 'descripcion': None, 'precio': None},
+        'obligatorias': ('nombre', 'descripcion', 'precio'),
+        'clave': 'nombre',
+    },
+}
+
+# DECIMAL(10, 2): hasta 8 dígitos enteros y 2 decimales
+_PRECIO_VALIDO = r'^\s*[0-9]{1,8}(\.[0-9]{1,2})?\s*$'
+MAX_RECHAZOS_DETALLE = 20
+
+
+class ArchivoInvalido(Exception):
+    pass
+
+
+def _encabezado(archivo):
+    linea = archivo.readline()
+    if isinstance(linea, bytes):
+        linea = linea.decode('utf-8-sig')
+    columnas = [c.strip().lower() for c in next(csv.reader([linea]), [])]
+    return columnas
+
+
+def _validar_encabezado(config, columnas):
+    """Lanza ArchivoInvalido si hay columnas desconocidas, repetidas o faltantes."""
+    desconocidas = [c for c in columnas if c not in config['columnas']]
+    if desconocidas:
+        raise ArchivoInvalido(f"Columnas desconocidas: {', '.join(desconocidas)}")
+    repetidas = sorted({c for c in columnas if columnas.count(c) > 1})
+    if repetidas:
+        raise ArchivoInvalido(f"Columnas repetidas: {', '.join(repetidas)}")
+    faltantes = [c for c in config['obligatorias'] if c not in columnas]
+    if faltantes:
+        raise ArchivoInvalido(f"Faltan columnas: {', '.join(faltantes)}")
+
+
+def _lineas(archivo):
+    for linea in archivo:
+        yield linea.decode('utf-8') if isinstance(linea, bytes) else linea
+
+
+def _volcado(archivo, columnas):
+    """
+    Reescribe las filas restantes de `archivo` como CSV (linea, *columnas, motivo)
+    para COPY. Las filas con otro número de columnas se conservan vacías y con su
+    motivo de rechazo; las líneas en blanco se omiten.
+    """
+    salida = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024, mode='w+', encoding='utf-8', newline='')
+    escritor = csv.writer(salida)
+    lector = csv.reader(_lineas(archivo))
+    try:
+        for campos in lector:
+            if not campos:
+                continue
+            # line_num cuenta desde la primera línea tras el encabezado
+            linea = lector.line_num + 1
+            if len(campos) == len(columnas):
+                escritor.writerow([linea, *campos, ''])
+            else:
+                escritor.writerow([linea, *([''] * len(columnas)),
+                                   f"se esperaban {len(columnas)} columnas y hay {len(campos)}"])
+    except UnicodeDecodeError:
+        salida.close()
+        raise ArchivoInvalido("El archivo no está codificado en UTF-8")
+    except csv.Error as e:
+        salida.close()
+        raise ArchivoInvalido(f"CSV inválido en la línea {lector.line_num + 1}: {e}")
+    salida.seek(0)
+    return salida
+
+
+def _motivo_rechazo(config, columnas):
+    """Expresión CASE que da el motivo de rechazo de una fila de la tabla temporal, o NULL."""
+    casos = []
+    for col in config['obligatorias']:
+        casos.append(sql.SQL("WHEN coalesce(trim({c}), '') = '' THEN {m}").format(
+            c=sql.Identifier(col), m=sql.Literal(f"{col} vacío")))
+    for col, largo in config['columnas'].items():
+        if largo and col in columnas:
+            casos.append(sql.SQL("WHEN length(trim({c})) > {n} THEN {m}").format(
+                c=sql.Identifier(col), n=sql.Literal(largo), m=sql.Literal(f"{col} demasiado largo")))
+    if 'precio' in columnas:
+        casos.append(sql.SQL("WHEN precio !~ {r} THEN 'precio no numérico'").format(r=sql.Literal(_PRECIO_VALIDO)))
+    return sql.SQL('CASE {} END').format(sql.SQL(' ').join(casos))
+
+
+def importar(conn, entidad, archivo, confirmar=True):
+    """
+    Importa el CSV `archivo` (objeto con read/readline, texto o bytes) en `entidad`.
+    Devuelve un dict con insertados, actualizados, sin_cambios, rechazados y el
+    detalle de las primeras filas rechazadas. Con confirmar=False solo valida
+    y deshace todo.
+    """
+    config = ENTIDADES[entidad]
+    columnas = _encabezado(archivo)
+    _validar_encabezado(config, columnas)
+
+    cur = conn.cursor()
+    try:
+        cur.execute(sql.SQL(
+            "CREATE TEMP TABLE importacion (linea BIGINT NOT NULL, {}, motivo TEXT) ON COMMIT DROP"
+        ).format(sql.SQL(', ').join(sql.SQL('{} TEXT').format(sql.Identifier(c)) for c in columnas)))
+        with _volcado(archivo, columnas) as volcado:
+            cur.copy_expert(
+                sql.SQL("COPY importacion (linea, {}, motivo) FROM STDIN WITH (FORMAT csv, ENCODING 'UTF8')").format(
+                    sql.SQL(', ').join(map(sql.Identifier, columnas))).as_string(conn),
+                volcado
+            )
+
+        # Las filas con columnas de más o de menos ya traen su motivo
+        cur.execute(sql.SQL("UPDATE importacion SET motivo = {} WHERE motivo IS NULL").format(
+            _motivo_rechazo(config, columnas)))
+        cur.execute(
+            'SELECT linea, motivo FROM importacion WHERE motivo IS NOT NULL ORDER BY linea LIMIT %s;',
+            (MAX_RECHAZOS_DETALLE,)
+        )
+        detalle = [{'linea': linea, 'motivo': motivo} for linea, motivo in cur.fetchall()]
+        cur.execute('SELECT count(*) FILTER (WHERE motivo IS NOT NULL), count(*) FROM importacion;')
+        rechazados, total = cur.fetchone()
+
+        clave = config['clave']
+        destino = [c for c in config['columnas'] if c in columnas]
+        valores = [
+            sql.SQL('trim({c})::numeric(10, 2)' if c == 'precio' else 'trim({c})').format(c=sql.Identifier(c))
+            for c in destino
+        ]
+        actualizables = [c for c in destino if c != clave]
+        cur.execute(sql.SQL(
+            "WITH filas AS ("
+            "  INSERT INTO {tabla} ({destino}) "
+            "  SELECT DISTINCT ON (trim({clave})) {valores} FROM importacion "
+            "  WHERE motivo IS NULL ORDER BY trim({clave}), linea DESC "
+            "  ON CONFLICT ({clave}) DO UPDATE SET {asignaciones} "
+            "  WHERE ({actuales}) IS DISTINCT FROM ({nuevos}) "
+            "  RETURNING (xmax = 0) AS insertado"
+            ") SELECT count(*) FILTER (WHERE insertado), count(*) FILTER (WHERE NOT insertado) FROM filas"
+        ).format(
+            tabla=sql.Identifier(entidad),
+            destino=sql.SQL(', ').join(map(sql.Identifier, destino)),
+            clave=sql.Identifier(clave),
+            valores=sql.SQL(', ').join(valores),
+            asignaciones=sql.SQL(', ').join(
+                sql.SQL('{c} = EXCLUDED.{c}').format(c=sql.Identifier(c)) for c in actualizables),
+            actuales=sql.SQL(', ').join(
+                sql.SQL('{t}.{c}').format(t=sql.Identifier(entidad), c=sql.Identifier(c)) for c in actualizables),
+            nuevos=sql.SQL(', ').join(
+                sql.SQL('EXCLUDED.{c}').format(c=sql.Identifier(c)) for c in actualizables),
+        ))
+        insertados, actualizados = cur.fetchone()
+        cur.execute(sql.SQL('SELECT count(DISTINCT trim({})) FROM importacion WHERE motivo IS NULL').format(
+            sql.Identifier(clave)))
+        distintos = cur.fetchone()[0]
+
+        if confirmar:
+            cache.publicar(cur, entidad)
+            conn.commit()
+        else:
+            conn.rollback()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+    return {
+        'filas': total,
+        'insertados': insertados,
+        'actualizados': actualizados,
+        'sin_cambios': distintos - insertados - actualizados,
+        'duplicados_en_archivo': total - rechazados - distintos,
+        'rechazados': rechazados,
+        'detalle_rechazos': detalle,
+        'confirmado': confirmar,
+    }
+
+
+def _solo_validar(args):
+    # ?validar=1, true, si...; ?validar=0 o false confirma como si no estuviera
+    return args.get('validar', '').strip().lower() in ('1', 'true', 'si', 'sí', 'yes', 'on')
+
+
+def responder(entidad):
+    """Atiende una subida HTTP: CSV en el campo "archivo"; con ?validar=1 no guarda."""
+    archivo = request.files.get('archivo')
+    if archivo is None:
+        return jsonify(error="Falta el archivo CSV en el campo 'archivo'"), 400
+
+    conn = get_db_connection()
+    try:
+        resultado = importar(conn, entidad, archivo.stream, confirmar=not _solo_validar(request.args))
+    except ArchivoInvalido as e:
+        return jsonify(error=str(e)), 400
+    except psycopg2.DataError as e:
+        # CSV mal formado (comillas sin cerrar, columnas de más...)
+        return jsonify(error="CSV inválido", details=str(e)), 400
+    finally:
+        conn.close()
+    return jsonify(resultado), 200
+
+
+if __name__ == '__main__':
+    from fabrica import configurar_desde_entorno
+
+    parser = argparse.ArgumentParser(description="Importa clientes o productos desde un CSV")
+    parser.add_argument('entidad', choices=sorted(ENTIDADES))
+    parser.add_argument('archivo')
+    parser.add_argument('--validar', action='store_true', help="validar sin guardar cambios")
+    args = parser.parse_args()
+    configurar_desde_entorno()
+    conn = get_db_connection()
+    try:
+        with io.open(args.archivo, 'rb') as archivo:
+            resultado = importar(conn, args.entidad, archivo, confirmar=not args.validar)
+    finally:
+        conn.close()
+    for clave, valor in resultado.items():
+        if clave != 'detalle_rechazos':
+            print(f"{clave}: {valor}")
+    for rechazo in resultado['detalle_rechazos']:
+        print(f"  línea {rechazo['linea']}: {rechazo['motivo']}")
@@ -1,13 +1,7 @@
 import psycopg2
 from psycopg2 import sql
 
-# Configuración de la base de datos
-DB_CONFIG = {
-    'host': 'localhost',
-    'database': 'facturacion_db',
-    'user': 'postgres',
-    'password': 'alumno'
-}
+from db import get_db_connection
 
 def create_tables():
     commands = (
@@ -30,13 +24,42 @@ def create_tables():
         )
         """,
         """
+        CREATE TABLE IF NOT EXISTS facturas_recurrentes (
+            id SERIAL PRIMARY KEY,
+            cliente_id INTEGER NOT NULL,
+            intervalo INTERVAL NOT NULL DEFAULT '1 month',
+            proxima_fecha DATE NOT NULL,
+            activa BOOLEAN NOT NULL DEFAULT TRUE,
+            FOREIGN KEY (cliente_id) REFERENCES clientes (id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS factura_recurrente_items (
+            id SERIAL PRIMARY KEY,
+            recurrente_id INTEGER NOT NULL,
+            producto_id INTEGER NOT NULL,
+            cantidad INTEGER NOT NULL,
+            FOREIGN KEY (recurrente_id) REFERENCES facturas_recurrentes (id),
+            FOREIGN KEY (producto_id) REFERENCES productos (id)
+        )
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS idx_facturas_recurrentes_pendientes
+            ON facturas_recurrentes (proxima_fecha) WHERE activa
+        """,
+        """
         CREATE TABLE IF NOT EXISTS facturas (
             id SERIAL PRIMARY KEY,
             numero VARCHAR(20) NOT NULL UNIQUE,
             fecha TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             cliente_id INTEGER NOT NULL,
             total DECIMAL(10, 2) NOT NULL,
-            FOREIGN KEY (cliente_id) REFERENCES clientes (id)
+            -- Facturas generadas por facturación recurrente: una por definición y periodo
+            recurrente_id INTEGER,
+            periodo DATE,
+            FOREIGN KEY (cliente_id) REFERENCES clientes (id),
+            FOREIGN KEY (recurrente_id) REFERENCES facturas_recurrentes (id),
+            UNIQUE (recurrente_id, periodo)
         )
         """,
         """
@@ -53,17 +76,92 @@ def create_tables():
         """,
         """
         CREATE SEQUENCE IF NOT EXISTS factura_numero_seq START WITH 1000
+        """,
         """
+        CREATE TABLE IF NOT EXISTS idempotencia (
+            clave VARCHAR(100) PRIMARY KEY,
+            factura_id INTEGER,
+            creada TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (factura_id) REFERENCES facturas (id)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_idempotencia_creada ON idempotencia (creada)",
+        """
+        CREATE TABLE IF NOT EXISTS saldos_clientes (
+            cliente_id INTEGER NOT NULL,
+            dia DATE NOT NULL,
+            facturas INTEGER NOT NULL,
+            importe DECIMAL(14, 2) NOT NULL,
+            -- Saldo del cliente al cierre del día, incluidas todas sus facturas anteriores
+            acumulado DECIMAL(14, 2) NOT NULL,
+            PRIMARY KEY (cliente_id, dia),
+            FOREIGN KEY (cliente_id) REFERENCES clientes (id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS cambios_precio (
+            id SERIAL PRIMARY KEY,
+            descripcion TEXT NOT NULL,
+            creado TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            terminado TIMESTAMP,
+            productos INTEGER
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS historial_precios (
+            id SERIAL PRIMARY KEY,
+            producto_id INTEGER NOT NULL,
+            cambio_id INTEGER NOT NULL,
+            precio_anterior DECIMAL(10, 2) NOT NULL,
+            precio_nuevo DECIMAL(10, 2) NOT NULL,
+            creado TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            -- El historial no impide borrar un producto que no está en ninguna factura
+            FOREIGN KEY (producto_id) REFERENCES productos (id) ON DELETE CASCADE,
+            FOREIGN KEY (cambio_id) REFERENCES cambios_precio (id),
+            UNIQUE (cambio_id, producto_id)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_historial_precios_producto ON historial_precios (producto_id, creado)",
+        # Índices para las comprobaciones de borrado (EXISTS por clave foránea)
+        # También sirve a los estados de cuenta (facturas de un cliente por fecha)
+        "CREATE INDEX IF NOT EXISTS idx_facturas_cliente ON facturas (cliente_id, fecha)",
+        "CREATE INDEX IF NOT EXISTS idx_factura_items_producto ON factura_items (producto_id)",
+        # Items de una factura (detalle) y comprobación de la clave foránea al borrar facturas
+        "CREATE INDEX IF NOT EXISTS idx_factura_items_factura ON factura_items (factura_id)",
+        "CREATE INDEX IF NOT EXISTS idx_facturas_recurrentes_cliente ON facturas_recurrentes (cliente_id)",
+        "CREATE INDEX IF NOT EXISTS idx_factura_recurrente_items_producto ON factura_recurrente_items (producto_id)",
+        # Claves naturales para la importación masiva del catálogo
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_clientes_email ON clientes (email)",
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_productos_nombre ON productos (nombre)",
+        # Orden de los listados
+        "CREATE INDEX IF NOT EXISTS idx_clientes_nombre ON clientes (nombre, id)",
+        "CREATE INDEX IF NOT EXISTS idx_productos_nombre ON productos (nombre, id)"
+    )
+
+    # Búsqueda ILIKE '%texto%' en los listados; requiere la extensión pg_trgm (contrib)
+    indices_trigramas = (
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        "CREATE INDEX IF NOT EXISTS idx_clientes_nombre_trgm ON clientes USING gin (nombre gin_trgm_ops)",
+        "CREATE INDEX IF NOT EXISTS idx_clientes_email_trgm ON clientes USING gin (email gin_trgm_ops)",
+        "CREATE INDEX IF NOT EXISTS idx_clientes_telefono_trgm ON clientes USING gin (telefono gin_trgm_ops)",
+        "CREATE INDEX IF NOT EXISTS idx_productos_nombre_trgm ON productos USING gin (nombre gin_trgm_ops)",
+        "CREATE INDEX IF NOT EXISTS idx_productos_descripcion_trgm ON productos USING gin (descripcion gin_trgm_ops)",
     )
     
     conn = None
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
+        conn = get_db_connection()
         cur = conn.cursor()
         
         # Eliminar tablas si existen (solo para desarrollo)
+        cur.execute("DROP TABLE IF EXISTS historial_precios CASCADE")
+        cur.execute("DROP TABLE IF EXISTS cambios_precio CASCADE")
+        cur.execute("DROP TABLE IF EXISTS saldos_clientes CASCADE")
+        cur.execute("DROP TABLE IF EXISTS idempotencia CASCADE")
         cur.execute("DROP TABLE IF EXISTS factura_items CASCADE")
         cur.execute("DROP TABLE IF EXISTS facturas CASCADE")
+        cur.execute("DROP TABLE IF EXISTS factura_recurrente_items CASCADE")
+        cur.execute("DROP TABLE IF EXISTS facturas_recurrentes CASCADE")
         cur.execute("DROP TABLE IF EXISTS productos CASCADE")
         cur.execute("DROP TABLE IF EXISTS clientes CASCADE")
         cur.execute("DROP SEQUENCE IF EXISTS factura_numero_seq")
@@ -71,6 +169,13 @@ def create_tables():
         
         for command in commands:
             cur.execute(command)
+
+        cur.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm';")
+        if cur.fetchone():
+            for command in indices_trigramas:
+                cur.execute(command)
+        else:
+            print("pg_trgm no disponible: la búsqueda en listados funcionará sin índices de trigramas.")
         
         # Insertar datos de prueba
         insert_test_data(cur)
@@ -105,18 +210,22 @@ def insert_test_data(cur):
     
     # Insertar productos
     productos = [
-        ("Producto A", "Descripción producto A", 10.50),
-        ("Producto B", "Descripción producto B", 25.75),
-        ("Producto C", "Descripción producto C", 5.99),
-        ("Producto D", "Descripción producto D", 100.00),
-        ("Producto E", "Descripción producto E", 15.25)
+        ("Producto A", "Descripción producto A", 10.50, 100),
+        ("Producto B", "Descripción producto B", 25.75, 100),
+        ("Producto C", "Descripción producto C", 5.99, 100),
+        ("Producto D", "Descripción producto D", 100.00, 100),
+        ("Producto E", "Descripción producto E", 15.25, 100)
     ]
     
     for producto in productos:
         cur.execute(
-            "INSERT INTO productos (nombre, descripcion, precio) VALUES (%s, %s, %s);",
+            "INSERT INTO productos (nombre, descripcion, precio, stock) VALUES (%s, %s, %s, %s);",
             producto
         )
 
 if __name__ == '__main__':
+    # Misma base que la aplicación: db.DB_CONFIG con las variables FACTURACION_*
+    from fabrica import configurar_desde_entorno
+
+    configurar_desde_entorno()
     create_tables()
\ No newline at end of file
@@ -0,0 +1,63 @@
+from preparadas import ejecutar, registrar
+
+# Bloquea las filas de productos siempre en orden de id: dos facturas con los
+# mismos productos esperan una por la otra en lugar de entrar en deadlock.
+registrar('bloquear_productos',
+          'SELECT id, precio, stock FROM productos WHERE id = ANY($1) ORDER BY id FOR UPDATE',
+          ('integer[]',))
+# Descuenta todas las líneas en una sola sentencia; la condición de stock es la
+# última defensa aunque las filas ya estén bloqueadas y comprobadas.
+registrar('descontar_stock',
+          'UPDATE productos p SET stock = p.stock - r.cantidad '
+          'FROM unnest($1::integer[], $2::integer[]) AS r(id, cantidad) '
+          'WHERE p.id = r.id AND p.stock >= r.cantidad '
+          'RETURNING p.id',
+          ('integer[]', 'integer[]'))
+
+
+class StockInsuficiente(Exception):
+    """Alguno de los productos pedidos no tiene stock suficiente."""
+
+    def __init__(self, faltantes):
+        # faltantes: {producto_id: (pedido, disponible)}
+        self.faltantes = faltantes
+        detalle = ', '.join(
+            f"producto {pid}: pedido {pedido}, disponible {disponible}"
+            for pid, (pedido, disponible) in sorted(faltantes.items())
+        )
+        super().__init__(f"Stock insuficiente ({detalle})")
+
+
+class ProductoNoEncontrado(Exception):
+    pass
+
+
+def reservar_stock(cur, cantidades):
+    """
+    Bloquea los productos de `cantidades` ({producto_id: cantidad}) y descuenta su
+    stock dentro de la transacción en curso. Devuelve {producto_id: precio}.
+    Lanza StockInsuficiente o ProductoNoEncontrado sin modificar nada; el
+    llamador debe hacer rollback en ese caso.
+    """
+    ids = sorted(cantidades)
+    ejecutar(cur, 'bloquear_productos', (ids,))
+    filas = cur.fetchall()
+
+    encontrados = {pid for pid, _, _ in filas}
+    if len(encontrados) != len(ids):
+        raise ProductoNoEncontrado(f"Productos no encontrados: {sorted(set(ids) - encontrados)}")
+
+    faltantes = {
+        pid: (cantidades[pid], stock)
+        for pid, _, stock in filas
+        if (stock or 0) < cantidades[pid]
+    }
+    if faltantes:
+        raise StockInsuficiente(faltantes)
+
+    ejecutar(cur, 'descontar_stock', (ids, [cantidades[pid] for pid in ids]))
+    if cur.rowcount != len(ids):
+        # No debería ocurrir con las filas bloqueadas, pero nunca se descuenta a medias
+        raise StockInsuficiente({pid: (cantidades[pid], stock) for pid, _, stock in filas})
+
+    return {pid: precio for pid, precio, _ in filas}
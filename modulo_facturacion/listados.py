@@ -0,0 +1,101 @@
+"""
+Listados paginados, ordenables y con búsqueda en el servidor para clientes y productos.
+
+Cada combinación de orden y búsqueda es una sentencia preparada distinta, que
+se registra la primera vez que se usa. En lugar de contar el total se pide una
+fila de más para saber si existe página siguiente.
+"""
+from collections import namedtuple
+
+from flask import render_template
+
+from db import conexion
+from preparadas import SENTENCIAS, ejecutar, registrar
+
+POR_PAGINA = 50
+# Con OFFSET no tiene sentido ir más lejos; además mantiene el OFFSET dentro de integer
+MAX_PAGINA = 10000
+
+LISTADOS = {
+    'clientes': {
+        'columnas': 'id, nombre, direccion, telefono, email',
+        'orden': ('nombre', 'email', 'telefono', 'id'),
+        'busqueda': ('nombre', 'email', 'telefono'),
+    },
+    'productos': {
+        'columnas': 'id, nombre, descripcion, precio',
+        'orden': ('nombre', 'precio', 'id'),
+        'busqueda': ('nombre', 'descripcion'),
+    },
+}
+
+Pagina = namedtuple('Pagina', 'filas pagina hay_siguiente q orden dir')
+
+
+def parametros(datos, entidad):
+    """Lee y valida pagina, q, orden y dir de `datos` (request.args o request.form)."""
+    try:
+        pagina = min(max(int(datos.get('pagina', '1')), 1), MAX_PAGINA)
+    except ValueError:
+        pagina = 1
+    q = datos.get('q', '').strip()
+    orden = datos.get('orden', 'nombre')
+    if orden not in LISTADOS[entidad]['orden']:
+        orden = 'nombre'
+    direccion = 'desc' if datos.get('dir') == 'desc' else 'asc'
+    return pagina, q, orden, direccion
+
+
+def estado(datos, entidad):
+    """Parámetros del listado como dict, para url_for al volver a la misma página."""
+    pagina, q, orden, direccion = parametros(datos, entidad)
+    return {'pagina': pagina, 'q': q, 'orden': orden, 'dir': direccion}
+
+
+def _sentencia(entidad, orden, direccion, con_busqueda):
+    nombre = f"listar_{entidad}_{orden}_{direccion}" + ('_q' if con_busqueda else '')
+    if nombre not in SENTENCIAS:
+        config = LISTADOS[entidad]
+        donde = ''
+        if con_busqueda:
+            donde = 'WHERE ' + ' OR '.join(f"{col} ILIKE $3" for col in config['busqueda']) + ' '
+        registrar(
+            nombre,
+            f"SELECT {config['columnas']} FROM {entidad} {donde}"
+            f"ORDER BY {orden} {direccion}, id {direccion} LIMIT $1 OFFSET $2",
+            ('integer', 'integer', 'text') if con_busqueda else ('integer', 'integer')
+        )
+    return nombre
+
+
+def patron(q):
+    # Buscar el texto literal: escapar los comodines de LIKE
+    return '%' + q.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+
+def sentencia(entidad, pagina=1, q='', orden='nombre', direccion='asc'):
+    """Nombre de la sentencia registrada y sus parámetros para la página pedida."""
+    nombre = _sentencia(entidad, orden, direccion, bool(q))
+    params = (POR_PAGINA + 1, (pagina - 1) * POR_PAGINA)
+    if q:
+        params += (patron(q),)
+    return nombre, params
+
+
+def pagina_de(filas, pagina=1, q='', orden='nombre', direccion='asc'):
+    return Pagina(filas[:POR_PAGINA], pagina, len(filas) > POR_PAGINA, q, orden, direccion)
+
+
+def consultar(cur, entidad, pagina=1, q='', orden='nombre', direccion='asc'):
+    nombre, params = sentencia(entidad, pagina, q, orden, direccion)
+    ejecutar(cur, nombre, params)
+    return pagina_de(cur.fetchall(), pagina, q, orden, direccion)
+
+
+def render_listado(entidad, template, datos, error=None):
+    """Renderiza solo la página pedida en `datos`, con su búsqueda y orden."""
+    with conexion() as conn:
+        cur = conn.cursor()
+        listado = consultar(cur, entidad, *parametros(datos, entidad))
+        cur.close()
+    return render_template(template, listado=listado, error=error, **{entidad: listado.filas})
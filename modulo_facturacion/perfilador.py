@@ -0,0 +1,111 @@
+"""
+Perfilado bajo demanda de peticiones individuales.
+
+Una petición se perfila si trae la cabecera X-Perfil con el token
+PERFIL_TOKEN de la configuración, o al azar con probabilidad PERFIL_MUESTREO.
+El perfil registra cada llamada Python y C del hilo de la petición (incluidas
+las de psycopg2 y el renderizado Jinja) y se guarda en PERFIL_DIR en formato de
+pilas colapsadas ("a;b;c microsegundos"), legible por flamegraph.pl,
+speedscope o inferno.
+
+Si no hay token ni muestreo no se registra ningún hook: coste cero.
+"""
+import hmac
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+
+from flask import g, request
+
+CABECERA = 'X-Perfil'
+
+
+def _nombre_python(frame):
+    code = frame.f_code
+    modulo = frame.f_globals.get('__name__', '?')
+    return f"{modulo}.{getattr(code, 'co_qualname', code.co_name)}"
+
+
+def _nombre_c(funcion):
+    duenio = getattr(funcion, '__self__', None)
+    modulo = getattr(funcion, '__module__', None)
+    if not modulo and duenio is not None:
+        modulo = type(duenio).__module__
+    return f"{modulo or 'builtins'}.{getattr(funcion, '__qualname__', repr(funcion))}"
+
+
+class Perfil:
+    """Acumula el tiempo propio de cada pila de llamadas mientras está activo en el hilo actual."""
+
+    def __init__(self):
+        self.pila = []
+        self.tiempos = defaultdict(float)
+        self.ultimo = None
+
+    def _evento(self, frame, evento, arg):
+        ahora = time.perf_counter()
+        if self.pila:
+            self.tiempos[tuple(self.pila)] += ahora - self.ultimo
+        if evento == 'call':
+            self.pila.append(_nombre_python(frame))
+        elif evento == 'c_call':
+            self.pila.append(_nombre_c(arg))
+        elif self.pila:
+            # return, c_return, c_exception; los frames anteriores al inicio no están en la pila
+            self.pila.pop()
+        self.ultimo = time.perf_counter()
+
+    def iniciar(self):
+        self.ultimo = time.perf_counter()
+        sys.setprofile(self._evento)
+
+    def detener(self):
+        sys.setprofile(None)
+
+    def guardar(self, directorio, nombre):
+        os.makedirs(directorio, exist_ok=True)
+        ruta = os.path.join(directorio, f"{nombre}.folded")
+        with open(ruta, 'w', encoding='utf-8') as f:
+            for pila, segundos in self.tiempos.items():
+                microsegundos = int(segundos * 1_000_000)
+                if microsegundos:
+                    f.write(';'.join(n.replace(';', ':') for n in pila) + f" {microsegundos}\n")
+        return ruta
+
+
+def _debe_perfilar(token_esperado, muestreo):
+    token = request.headers.get(CABECERA)
+    # En bytes: compare_digest rechaza str con caracteres no ASCII
+    if token and token_esperado and hmac.compare_digest(token.encode(), token_esperado.encode()):
+        return True
+    return muestreo > 0 and random.random() < muestreo
+
+
+def registrar_perfilador(app):
+    # Desde el entorno (from_prefixed_env) un token numérico llega como int
+    token_esperado = str(app.config.get('PERFIL_TOKEN') or '')
+    muestreo = float(app.config.get('PERFIL_MUESTREO') or 0)
+    directorio = app.config.get('PERFIL_DIR', 'perfiles')
+    if not token_esperado and muestreo <= 0:
+        return
+
+    @app.before_request
+    def _iniciar_perfil():
+        if _debe_perfilar(token_esperado, muestreo):
+            g.perfil = Perfil()
+            g.perfil.iniciar()
+
+    @app.teardown_request
+    def _guardar_perfil(exc):
+        perfil = g.pop('perfil', None)
+        if perfil is None:
+            return
+        perfil.detener()
+        nombre = f"{time.strftime('%Y%m%d-%H%M%S')}-{request.endpoint or 'desconocido'}-{os.getpid()}-{id(perfil):x}"
+        try:
+            ruta = perfil.guardar(directorio, nombre)
+            app.logger.info("Perfil de %s guardado en %s", request.path, ruta)
+        except OSError:
+            app.logger.error("No se pudo guardar el perfil", exc_info=True)
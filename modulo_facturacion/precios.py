@@ -0,0 +1,246 @@
+"""
+Cambio masivo de precios de productos.
+
+Una selección (ids, búsqueda por texto como la de los listados y/o rango de
+precio) y una regla (porcentaje, importe absoluto o solo redondeo, con
+redondeo opcional a un múltiplo) se convierten en un único UPDATE por lote de
+LOTE productos, que además guarda una fila por producto en historial_precios.
+Todas las reglas son la misma expresión: round((precio * factor + suma) / multiplo) * multiplo.
+
+Cada lote se confirma por separado para no bloquear productos durante toda la
+operación (las facturas con inventario los bloquean). Si se interrumpe, volver
+a aplicar con el mismo cambio_id continúa sin repetir los productos ya
+cambiados. Las facturas existentes no se ven afectadas: cada línea guarda su
+precio en factura_items.
+
+Uso: python precios.py --porcentaje 5 [--q texto] [--ids 1,2,3] [--redondeo 0.10] [--aplicar]
+"""
+import argparse
+from collections import namedtuple
+from decimal import Decimal, InvalidOperation
+
+import cache
+import listados
+from db import get_db_connection
+
+LOTE = 5000
+MUESTRA = 100
+TIPOS = ('porcentaje', 'absoluto', 'redondeo')
+# Mayor importe de productos.precio (DECIMAL(10, 2)) y mayor porcentaje de ajuste
+MAXIMO = Decimal('99999999.99')
+PORCENTAJE_MAXIMO = Decimal('1000')
+
+Seleccion = namedtuple('Seleccion', 'ids q precio_min precio_max')
+Regla = namedtuple('Regla', 'tipo valor redondeo')
+Vista = namedtuple('Vista', 'seleccionados cambian negativos diferencia filas')
+
+_NUEVO = '(round((precio * %(factor)s + %(suma)s) / %(multiplo)s) * %(multiplo)s)::numeric(10, 2)'
+
+
+def _decimal(texto, campo, maximo=MAXIMO):
+    if not texto or not texto.strip():
+        return None
+    try:
+        valor = Decimal(texto.strip().replace(',', '.'))
+    except InvalidOperation:
+        raise ValueError(f"{campo} no es un número válido.")
+    # Decimal acepta NaN e Infinity, que PostgreSQL guardaría tal cual
+    if not valor.is_finite():
+        raise ValueError(f"{campo} no es un número válido.")
+    if abs(valor) > maximo:
+        raise ValueError(f"{campo} no puede superar {maximo} en valor absoluto.")
+    return valor
+
+
+def seleccion_de(datos):
+    """Lee ids (separados por comas o espacios), q, precio_min y precio_max de `datos`."""
+    texto_ids = datos.get('ids', '').replace(',', ' ').split()
+    if not all(i.isdigit() for i in texto_ids):
+        raise ValueError("La lista de ids solo puede contener números.")
+    return Seleccion(
+        sorted({int(i) for i in texto_ids}) or None,
+        datos.get('q', '').strip(),
+        _decimal(datos.get('precio_min', ''), "El precio mínimo"),
+        _decimal(datos.get('precio_max', ''), "El precio máximo"),
+    )
+
+
+def regla_de(datos):
+    """Lee tipo, valor y redondeo de `datos`."""
+    tipo = datos.get('tipo', 'porcentaje')
+    if tipo not in TIPOS:
+        raise ValueError(f"Tipo de regla desconocido: {tipo}")
+    valor = _decimal(datos.get('valor', ''), "El valor") or Decimal('0')
+    redondeo = _decimal(datos.get('redondeo', ''), "El redondeo") or Decimal('0.01')
+    if redondeo <= 0:
+        raise ValueError("El redondeo debe ser mayor que cero.")
+    if tipo == 'porcentaje' and valor <= -100:
+        raise ValueError("Un porcentaje de -100 o menos deja los precios en cero o negativos.")
+    if tipo == 'porcentaje' and valor > PORCENTAJE_MAXIMO:
+        raise ValueError(f"El porcentaje no puede superar {PORCENTAJE_MAXIMO}.")
+    return Regla(tipo, valor, redondeo)
+
+
+def describir(regla):
+    ajuste = {
+        'porcentaje': f"{regla.valor:+}%",
+        'absoluto': f"{regla.valor:+} por unidad",
+        'redondeo': "sin ajuste",
+    }[regla.tipo]
+    return f"{ajuste}, redondeo a {regla.redondeo}"
+
+
+def _filtro(seleccion):
+    condiciones, params = [], {}
+    if seleccion.ids:
+        condiciones.append('id = ANY(%(ids)s)')
+        params['ids'] = seleccion.ids
+    if seleccion.q:
+        condiciones.append('(' + ' OR '.join(
+            f"{col} ILIKE %(q)s" for col in listados.LISTADOS['productos']['busqueda']
+        ) + ')')
+        params['q'] = listados.patron(seleccion.q)
+    if seleccion.precio_min is not None:
+        condiciones.append('precio >= %(precio_min)s')
+        params['precio_min'] = seleccion.precio_min
+    if seleccion.precio_max is not None:
+        condiciones.append('precio <= %(precio_max)s')
+        params['precio_max'] = seleccion.precio_max
+    return ' AND '.join(condiciones) or 'TRUE', params
+
+
+def _parametros(regla):
+    factor, suma = Decimal('1'), Decimal('0')
+    if regla.tipo == 'porcentaje':
+        factor += regla.valor / 100
+    elif regla.tipo == 'absoluto':
+        suma = regla.valor
+    return {'factor': factor, 'suma': suma, 'multiplo': regla.redondeo}
+
+
+def previsualizar(cur, seleccion, regla, muestra=MUESTRA):
+    """
+    Cuántos productos se seleccionan, cuántos cambian de precio, cuántos
+    quedarían negativos y la diferencia total de precios, con las primeras
+    `muestra` filas (id, nombre, precio actual, precio nuevo) que cambian.
+    """
+    filtro, params = _filtro(seleccion)
+    params.update(_parametros(regla), muestra=muestra)
+    cur.execute(
+        f'WITH objetivo AS (SELECT id, nombre, precio AS anterior, {_NUEVO} AS nuevo '
+        f'                  FROM productos WHERE {filtro}) '
+        'SELECT count(*), count(*) FILTER (WHERE nuevo <> anterior), count(*) FILTER (WHERE nuevo < 0), '
+        '       COALESCE(sum(nuevo - anterior), 0), '
+        # Importes como texto dentro del JSON para no pasar por float
+        '       (SELECT COALESCE(json_agg(json_build_array(id, nombre, anterior::text, nuevo::text)), \'[]\') '
+        '        FROM (SELECT id, nombre, anterior, nuevo FROM objetivo WHERE nuevo <> anterior '
+        '              ORDER BY id LIMIT %(muestra)s) m) '
+        'FROM objetivo;',
+        params
+    )
+    seleccionados, cambian, negativos, diferencia, filas = cur.fetchone()
+    filas = [(producto_id, nombre, Decimal(anterior), Decimal(nuevo))
+             for producto_id, nombre, anterior, nuevo in filas]
+    return Vista(seleccionados, cambian, negativos, diferencia, filas)
+
+
+def aplicar(conn, seleccion, regla, cambio_id=None, lote=LOTE):
+    """
+    Aplica la regla a la selección, confirmando cada lote. Devuelve
+    (cambio_id, productos cambiados). Con `cambio_id` retoma un cambio
+    interrumpido.
+    """
+    cur = conn.cursor()
+    try:
+        vista = previsualizar(cur, seleccion, regla, muestra=0)
+        if vista.negativos:
+            raise ValueError(f"{vista.negativos} productos quedarían con precio negativo.")
+
+        if cambio_id is None:
+            cur.execute('INSERT INTO cambios_precio (descripcion) VALUES (%s) RETURNING id;', (describir(regla),))
+            cambio_id = cur.fetchone()[0]
+            conn.commit()
+
+        filtro, params = _filtro(seleccion)
+        params.update(_parametros(regla), cambio=cambio_id, lote=lote, desde=0)
+        cambiados = 0
+        while True:
+            # Un lote: bloquear, actualizar y registrar el historial en una sola sentencia.
+            # Los productos ya cambiados por este cambio_id no se vuelven a tocar.
+            cur.execute(
+                f'WITH objetivo AS ('
+                f'  SELECT id, precio AS anterior, {_NUEVO} AS nuevo FROM productos '
+                f'  WHERE {filtro} AND id > %(desde)s AND NOT EXISTS ('
+                '    SELECT 1 FROM historial_precios h WHERE h.cambio_id = %(cambio)s AND h.producto_id = productos.id'
+                '  ) ORDER BY id LIMIT %(lote)s FOR UPDATE'
+                '), cambiados AS ('
+                '  UPDATE productos p SET precio = o.nuevo FROM objetivo o '
+                '  WHERE p.id = o.id AND o.nuevo <> o.anterior RETURNING p.id, o.anterior, o.nuevo'
+                '), historial AS ('
+                '  INSERT INTO historial_precios (producto_id, cambio_id, precio_anterior, precio_nuevo) '
+                '  SELECT id, %(cambio)s, anterior, nuevo FROM cambiados'
+                ') '
+                'SELECT max(id), (SELECT count(*) FROM cambiados) FROM objetivo;',
+                params
+            )
+            ultimo, n = cur.fetchone()
+            if ultimo is None:
+                break
+            if n:
+                cache.publicar(cur, 'productos')
+            conn.commit()
+            cambiados += n
+            params['desde'] = ultimo
+
+        cur.execute('UPDATE cambios_precio SET terminado = now(), productos = '
+                    '(SELECT count(*) FROM historial_precios WHERE cambio_id = %s) WHERE id = %s;',
+                    (cambio_id, cambio_id))
+        conn.commit()
+    finally:
+        cur.close()
+    return cambio_id, cambiados
+
+
+if __name__ == '__main__':
+    from fabrica import configurar_desde_entorno
+
+    parser = argparse.ArgumentParser(description="Cambio masivo de precios de productos")
+    regla = parser.add_mutually_exclusive_group(required=True)
+    regla.add_argument('--porcentaje')
+    regla.add_argument('--absoluto')
+    regla.add_argument('--solo-redondeo', action='store_true')
+    parser.add_argument('--redondeo', default='')
+    parser.add_argument('--ids', default='')
+    parser.add_argument('--q', default='')
+    parser.add_argument('--precio-min', default='')
+    parser.add_argument('--precio-max', default='')
+    parser.add_argument('--cambio', type=int, default=None, help="retomar un cambio interrumpido")
+    parser.add_argument('--lote', type=int, default=LOTE)
+    parser.add_argument('--aplicar', action='store_true', help="sin esta opción solo se muestra la vista previa")
+    args = parser.parse_args()
+    configurar_desde_entorno()
+
+    tipo = 'porcentaje' if args.porcentaje else 'absoluto' if args.absoluto else 'redondeo'
+    try:
+        regla = regla_de({'tipo': tipo, 'valor': args.porcentaje or args.absoluto or '', 'redondeo': args.redondeo})
+        seleccion = seleccion_de({'ids': args.ids, 'q': args.q,
+                                  'precio_min': args.precio_min, 'precio_max': args.precio_max})
+    except ValueError as e:
+        parser.error(str(e))
+
+    conn = get_db_connection()
+    try:
+        cur = conn.cursor()
+        vista = previsualizar(cur, seleccion, regla)
+        cur.close()
+        conn.rollback()
+        print(f"Regla: {describir(regla)}")
+        print(f"Seleccionados: {vista.seleccionados}, cambian: {vista.cambian}, "
+              f"negativos: {vista.negativos}, diferencia total: {vista.diferencia}")
+        for producto_id, nombre, anterior, nuevo in vista.filas[:20]:
+            print(f"  {producto_id:>8} {nombre[:40]:<40} {anterior:>12} -> {nuevo:<12}")
+        if args.aplicar:
+            cambio_id, cambiados = aplicar(conn, seleccion, regla, args.cambio, args.lote)
+            print(f"Cambio {cambio_id}: {cambiados} productos actualizados")
+    finally:
+        conn.close()
@@ -0,0 +1,98 @@
+from psycopg2 import errors as pg_errors
+from psycopg2 import extensions
+
+# Registro de sentencias calientes: nombre -> (sql con $n, tipos de los parámetros).
+# Se preparan una vez por conexión del pool y luego se ejecutan por nombre.
+SENTENCIAS = {}
+
+# Errores tras los que la sentencia preparada ya no sirve:
+# - InvalidSqlStatementName: la sesión la perdió (reconexión, DISCARD ALL).
+# - FeatureNotSupported: "cached plan must not change result type" tras un cambio de esquema.
+_ERRORES_REPREPARAR = (pg_errors.InvalidSqlStatementName, pg_errors.FeatureNotSupported)
+
+
+def registrar(nombre, sql, tipos=()):
+    SENTENCIAS[nombre] = (sql, tuple(tipos))
+
+
+registrar('listar_facturas',
+          'SELECT f.id, f.numero, f.fecha, c.nombre as cliente, f.total '
+          'FROM facturas f JOIN clientes c ON f.cliente_id = c.id ORDER BY f.fecha DESC')
+registrar('factura_cabecera',
+          'SELECT f.id, f.numero, f.fecha, f.total, c.id as cliente_id, c.nombre as cliente_nombre, '
+          'c.direccion as cliente_direccion, c.telefono as cliente_telefono '
+          'FROM facturas f JOIN clientes c ON f.cliente_id = c.id WHERE f.id = $1',
+          ('integer',))
+registrar('factura_items',
+          'SELECT fi.id, p.nombre as producto, fi.cantidad, fi.precio, fi.subtotal '
+          'FROM factura_items fi JOIN productos p ON fi.producto_id = p.id '
+          'WHERE fi.factura_id = $1',
+          ('integer',))
+registrar('opciones_clientes', 'SELECT id, nombre FROM clientes ORDER BY nombre')
+registrar('opciones_productos', 'SELECT id, nombre, precio FROM productos ORDER BY nombre')
+registrar('precios_productos',
+          'SELECT id, precio FROM productos WHERE id = ANY($1)',
+          ('integer[]',))
+# KEY SHARE: el cliente no se puede borrar hasta que la factura confirme
+registrar('bloquear_cliente', 'SELECT 1 FROM clientes WHERE id = $1 FOR KEY SHARE', ('integer',))
+registrar('siguiente_numero_factura', "SELECT nextval('factura_numero_seq')")
+registrar('insertar_factura',
+          'INSERT INTO facturas (numero, cliente_id, total) VALUES ($1, $2, $3) RETURNING id',
+          ('varchar', 'integer', 'numeric'))
+registrar('insertar_factura_item',
+          'INSERT INTO factura_items (factura_id, producto_id, cantidad, precio, subtotal) '
+          'VALUES ($1, $2, $3, $4, $5)',
+          ('integer', 'integer', 'integer', 'numeric', 'numeric'))
+# Comprobaciones de borrado: existencia por índice, sin contar filas
+registrar('cliente_en_uso',
+          'SELECT EXISTS (SELECT 1 FROM facturas WHERE cliente_id = $1) '
+          'OR EXISTS (SELECT 1 FROM facturas_recurrentes WHERE cliente_id = $1)',
+          ('integer',))
+registrar('producto_en_uso',
+          'SELECT EXISTS (SELECT 1 FROM factura_items WHERE producto_id = $1) '
+          'OR EXISTS (SELECT 1 FROM factura_recurrente_items WHERE producto_id = $1)',
+          ('integer',))
+
+
+def _preparar(cur, nombre):
+    conn = cur.connection
+    if conn.preparadas is None:
+        # Estado desconocido en el servidor: empezar de cero
+        cur.execute('DEALLOCATE ALL')
+        conn.preparadas = set()
+    if nombre in conn.preparadas:
+        return
+    sql, tipos = SENTENCIAS[nombre]
+    if tipos:
+        cur.execute(f"PREPARE {nombre} ({', '.join(tipos)}) AS {sql}")
+    else:
+        cur.execute(f"PREPARE {nombre} AS {sql}")
+    conn.preparadas.add(nombre)
+
+
+def _execute_sql(nombre, n_params):
+    if not n_params:
+        return f"EXECUTE {nombre}"
+    return f"EXECUTE {nombre} ({', '.join(['%s'] * n_params)})"
+
+
+def ejecutar(cur, nombre, params=()):
+    """
+    Ejecuta la sentencia registrada `nombre` con `params`, preparándola antes si hace falta.
+    Si el servidor ya no la reconoce y no había una transacción abierta, se vuelve a
+    preparar y se reintenta; dentro de una transacción el error se propaga (el
+    llamador hace rollback) y la conexión queda marcada para re-preparar en el próximo uso.
+    """
+    conn = cur.connection
+    sin_transaccion = conn.info.transaction_status == extensions.TRANSACTION_STATUS_IDLE
+    sql = _execute_sql(nombre, len(params))
+    try:
+        _preparar(cur, nombre)
+        cur.execute(sql, params)
+    except _ERRORES_REPREPARAR:
+        conn.preparadas = None
+        if not sin_transaccion:
+            raise
+        conn.rollback()
+        _preparar(cur, nombre)
+        cur.execute(sql, params)
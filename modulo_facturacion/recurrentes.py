@@ -0,0 +1,218 @@
+"""
+Facturación recurrente: definiciones (cliente, items, intervalo) y la corrida
+por lotes que genera las facturas vencidas de cada ciclo.
+
+La corrida reparte los clientes entre un pool de procesos; cada proceso
+escribe en transacciones de `lote` definiciones, toma los números de factura
+de `factura_numero_seq` en bloque y avanza `proxima_fecha` en la misma
+transacción. Si se interrumpe basta con volver a ejecutarla: lo ya confirmado
+no vuelve a estar pendiente y UNIQUE (recurrente_id, periodo) impide duplicados.
+
+Con inventario activo (--inventario o FACTURACION_INVENTARIO_ACTIVO=true) cada
+lote bloquea y descuenta el stock de sus productos; las definiciones sin stock
+quedan pendientes para la próxima corrida.
+
+Uso: python recurrentes.py [--fecha AAAA-MM-DD] [--procesos N] [--lote N] [--inventario]
+"""
+import argparse
+import datetime
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+
+from psycopg2.extras import execute_values
+
+import db
+import estados
+from db import get_db_connection
+from inventario import StockInsuficiente
+from preparadas import ejecutar
+
+PROCESOS = 4
+LOTE = 500
+
+
+def crear_recurrente(cur, cliente_id, items, proxima_fecha, intervalo='1 month'):
+    """Registra una definición recurrente con sus items [(producto_id, cantidad)] y devuelve su id."""
+    cur.execute(
+        'INSERT INTO facturas_recurrentes (cliente_id, intervalo, proxima_fecha) VALUES (%s, %s, %s) RETURNING id;',
+        (cliente_id, intervalo, proxima_fecha)
+    )
+    recurrente_id = cur.fetchone()[0]
+    execute_values(
+        cur,
+        'INSERT INTO factura_recurrente_items (recurrente_id, producto_id, cantidad) VALUES %s',
+        [(recurrente_id, producto_id, cantidad) for producto_id, cantidad in items]
+    )
+    return recurrente_id
+
+
+def _con_stock(facturables, items, stock):
+    """
+    Las definiciones de `facturables`, en orden de id, cuyas líneas caben en el
+    stock que queda tras las anteriores. Descuenta de `stock` lo asignado.
+    """
+    aceptadas = []
+    for definicion in facturables:
+        pedido = defaultdict(int)
+        for producto_id, cantidad, _, _ in items[definicion[0]]:
+            pedido[producto_id] += cantidad
+        if all(stock[pid] >= cantidad for pid, cantidad in pedido.items()):
+            for pid, cantidad in pedido.items():
+                stock[pid] -= cantidad
+            aceptadas.append(definicion)
+    return aceptadas
+
+
+def _procesar_lote(cur, ids, fecha, inventario=False):
+    """
+    Genera las facturas de un lote de definiciones. Devuelve cuántas creó.
+
+    Con `inventario` bloquea los productos del lote en orden de id, como las
+    facturas del formulario, y descuenta su stock. Una definición sin stock
+    suficiente no se factura ni avanza: queda pendiente para la próxima corrida.
+    """
+    # Otra corrida simultánea se salta las definiciones que ya estamos facturando
+    cur.execute(
+        'SELECT id, cliente_id, proxima_fecha FROM facturas_recurrentes '
+        'WHERE id = ANY(%s) AND activa AND proxima_fecha <= %s '
+        'ORDER BY id FOR UPDATE SKIP LOCKED;',
+        (ids, fecha)
+    )
+    definiciones = cur.fetchall()
+    if not definiciones:
+        return 0
+    def_ids = [d[0] for d in definiciones]
+
+    cur.execute(
+        'SELECT recurrente_id, producto_id, cantidad FROM factura_recurrente_items '
+        'WHERE recurrente_id = ANY(%s) ORDER BY recurrente_id, id;',
+        (def_ids,)
+    )
+    lineas = cur.fetchall()
+    productos = sorted({producto_id for _, producto_id, _ in lineas})
+    if inventario:
+        ejecutar(cur, 'bloquear_productos', (productos,))
+    else:
+        cur.execute('SELECT id, precio, NULL FROM productos WHERE id = ANY(%s);', (productos,))
+    precios, stock = {}, {}
+    for producto_id, precio, disponible in cur.fetchall():
+        precios[producto_id], stock[producto_id] = precio, disponible or 0
+
+    items = defaultdict(list)
+    for recurrente_id, producto_id, cantidad in lineas:
+        precio = precios[producto_id]
+        items[recurrente_id].append((producto_id, cantidad, precio, precio * cantidad))
+
+    facturables = [d for d in definiciones if items[d[0]]]
+    if inventario:
+        con_stock = _con_stock(facturables, items, stock)
+        sin_stock = {d[0] for d in facturables} - {d[0] for d in con_stock}
+        def_ids = [i for i in def_ids if i not in sin_stock]
+        facturables = con_stock
+
+    if facturables:
+        # Un bloque de números de factura en una sola ida y vuelta
+        cur.execute("SELECT nextval('factura_numero_seq') FROM generate_series(1, %s);", (len(facturables),))
+        numeros = [row[0] for row in cur.fetchall()]
+
+        filas = [
+            (f"FACT-{numero}", cliente_id, sum((it[3] for it in items[recurrente_id]), Decimal('0')),
+             recurrente_id, periodo)
+            for numero, (recurrente_id, cliente_id, periodo) in zip(numeros, facturables)
+        ]
+        creadas = execute_values(
+            cur,
+            'INSERT INTO facturas (numero, cliente_id, total, recurrente_id, periodo) VALUES %s '
+            'ON CONFLICT (recurrente_id, periodo) DO NOTHING RETURNING id, recurrente_id, cliente_id',
+            filas, fetch=True
+        )
+        execute_values(
+            cur,
+            'INSERT INTO factura_items (factura_id, producto_id, cantidad, precio, subtotal) VALUES %s',
+            [(factura_id,) + item for factura_id, recurrente_id, _ in creadas for item in items[recurrente_id]]
+        )
+        if inventario and creadas:
+            # Solo lo de las facturas creadas: un periodo ya facturado no descuenta dos veces
+            cantidades = defaultdict(int)
+            for _, recurrente_id, _ in creadas:
+                for producto_id, cantidad, _, _ in items[recurrente_id]:
+                    cantidades[producto_id] += cantidad
+            descontar = sorted(cantidades)
+            ejecutar(cur, 'descontar_stock', (descontar, [cantidades[pid] for pid in descontar]))
+            if cur.rowcount != len(descontar):
+                # No debería ocurrir con las filas bloqueadas, pero nunca se descuenta a medias
+                raise StockInsuficiente({pid: (cantidades[pid], stock[pid]) for pid in descontar})
+        estados.acumular(cur, [(factura_id, cliente_id) for factura_id, _, cliente_id in creadas])
+    else:
+        creadas = []
+
+    cur.execute(
+        'UPDATE facturas_recurrentes SET proxima_fecha = proxima_fecha + intervalo WHERE id = ANY(%s);',
+        (def_ids,)
+    )
+    return len(creadas)
+
+
+def _procesar_shard(args):
+    ids, fecha, lote, inventario, db_config = args
+    # Con spawn o forkserver el proceso no hereda lo fijado con db.configurar()
+    db.configurar(db_config)
+    conn = get_db_connection()
+    cur = conn.cursor()
+    creadas = 0
+    try:
+        for i in range(0, len(ids), lote):
+            creadas += _procesar_lote(cur, ids[i:i + lote], fecha, inventario)
+            conn.commit()
+    finally:
+        cur.close()
+        conn.close()
+    return creadas
+
+
+def generar(fecha=None, procesos=PROCESOS, lote=LOTE, inventario=False):
+    """
+    Factura todas las definiciones activas con proxima_fecha <= `fecha`.
+    Cada definición avanza un intervalo por corrida; las muy atrasadas se ponen
+    al día en corridas sucesivas. Con `inventario` descuenta el stock como las
+    facturas del formulario. Devuelve el número de facturas creadas.
+    """
+    fecha = fecha or datetime.date.today()
+
+    conn = get_db_connection()
+    cur = conn.cursor()
+    cur.execute(
+        'SELECT id, cliente_id FROM facturas_recurrentes '
+        'WHERE activa AND proxima_fecha <= %s ORDER BY id;',
+        (fecha,)
+    )
+    pendientes = cur.fetchall()
+    cur.close()
+    # Cerrar antes de crear los procesos: una conexión no se comparte entre forks
+    conn.close()
+
+    # Todas las definiciones de un mismo cliente van al mismo proceso
+    shards = [[] for _ in range(procesos)]
+    for recurrente_id, cliente_id in pendientes:
+        shards[cliente_id % procesos].append(recurrente_id)
+
+    with ProcessPoolExecutor(max_workers=procesos) as executor:
+        return sum(executor.map(_procesar_shard, [(ids, fecha, lote, inventario, dict(db.DB_CONFIG)) for ids in shards if ids]))
+
+
+if __name__ == '__main__':
+    from fabrica import configurar_desde_entorno
+
+    config = configurar_desde_entorno()
+    parser = argparse.ArgumentParser(description="Genera las facturas recurrentes vencidas")
+    parser.add_argument('--fecha', type=datetime.date.fromisoformat, default=None)
+    parser.add_argument('--procesos', type=int, default=PROCESOS)
+    parser.add_argument('--lote', type=int, default=LOTE)
+    # Por defecto, el mismo INVENTARIO_ACTIVO que la aplicación
+    parser.add_argument('--inventario', action=argparse.BooleanOptionalAction,
+                        default=bool(config['INVENTARIO_ACTIVO']),
+                        help="descontar stock de los productos facturados")
+    args = parser.parse_args()
+    creadas = generar(args.fecha, args.procesos, args.lote, args.inventario)
+    print(f"Facturas recurrentes creadas: {creadas}")
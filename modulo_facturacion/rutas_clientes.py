@@ -0,0 +1,149 @@
+import datetime
+
+from flask import Blueprint, jsonify, render_template, request, redirect, url_for
+import psycopg2
+
+import cache
+import estados
+import importacion
+import listados
+from db import conexion, get_db_connection
+from preparadas import ejecutar
+
+bp = Blueprint('clientes', __name__)
+
+@bp.route('/clientes')
+def listar_clientes():
+    return listados.render_listado('clientes', 'clientes.html', request.args)
+
+@bp.route('/agregar_cliente', methods=['GET', 'POST'])
+def agregar_cliente():
+    if request.method == 'POST':
+        nombre = request.form.get('nombre')
+        direccion = request.form.get('direccion')
+        email = request.form.get('email')
+        telefono = request.form.get('telefono')
+
+        if not nombre or not direccion or not email or not telefono:
+            return render_template('agregar_cliente.html', error="Todos los campos son obligatorios.")
+
+        conn = get_db_connection()
+        cur = conn.cursor()
+        try:
+            cur.execute(
+                "INSERT INTO clientes (nombre, direccion, telefono, email) VALUES (%s, %s, %s, %s);",
+                (nombre, direccion, telefono, email)
+            )
+            cache.publicar(cur, 'clientes')
+            conn.commit()
+        except psycopg2.errors.UniqueViolation:
+            # uq_clientes_email: el email es la clave de la importación
+            conn.rollback()
+            return render_template('agregar_cliente.html',
+                                   error="Ya existe un cliente con ese correo electrónico."), 409
+        finally:
+            cur.close()
+            conn.close()
+
+        return redirect(url_for('clientes.listar_clientes'))
+
+    return render_template('agregar_cliente.html')
+
+
+@bp.route('/eliminar_cliente/<int:id>', methods=['POST'])
+def eliminar_cliente(id):
+    with conexion() as conn:
+        cur = conn.cursor()
+
+        # Verificar si el cliente tiene facturas asociadas antes de eliminar
+        ejecutar(cur, 'cliente_en_uso', (id,))
+        en_uso = cur.fetchone()[0]
+
+        if not en_uso:
+            try:
+                cur.execute('DELETE FROM clientes WHERE id = %s;', (id,))
+                cache.publicar(cur, 'clientes', id)
+                conn.commit()
+            except psycopg2.errors.ForeignKeyViolation:
+                # Una factura creada entre la comprobación y el borrado
+                conn.rollback()
+                en_uso = True
+        cur.close()
+
+    if en_uso:
+        # Volver a mostrar la página en la que estaba el usuario, con el error
+        return listados.render_listado('clientes', 'clientes.html', request.form,
+                               error="No se puede eliminar el cliente porque tiene facturas asociadas.")
+
+    return redirect(url_for('clientes.listar_clientes', **listados.estado(request.form, 'clientes')))
+
+
+@bp.route('/clientes/<int:id>/editar')
+def editar_cliente(id):
+    conn = get_db_connection()
+    cur = conn.cursor()
+    cur.execute('SELECT * FROM clientes WHERE id = %s;', (id,))
+    cliente = cur.fetchone()
+    cur.close()
+    conn.close()
+
+    if cliente is None:
+        return "Cliente no encontrado", 404
+
+    return render_template('editar_cliente.html', cliente=cliente)
+
+
+@bp.route('/clientes/<int:id>/actualizar', methods=['POST'])
+def actualizar_cliente(id):
+    nombre = request.form['nombre']
+    direccion = request.form['direccion']
+    telefono = request.form['telefono']
+    email = request.form['email']
+
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute("""
+            UPDATE clientes
+            SET nombre = %s, direccion = %s, telefono = %s, email = %s
+            WHERE id = %s;
+        """, (nombre, direccion, telefono, email, id))
+        cache.publicar(cur, 'clientes', id)
+        conn.commit()
+    except psycopg2.errors.UniqueViolation:
+        conn.rollback()
+        return render_template('editar_cliente.html', cliente=(id, nombre, direccion, telefono, email),
+                               error="Ya existe un cliente con ese correo electrónico."), 409
+    finally:
+        cur.close()
+        conn.close()
+
+    return redirect(url_for('clientes.listar_clientes'))
+
+
+@bp.route('/clientes/<int:id>/estado')
+def estado_cuenta(id):
+    # Periodo en ?desde=AAAA-MM-DD&hasta=AAAA-MM-DD; ?formato=json devuelve JSON
+    try:
+        desde, hasta = estados.periodo(
+            *(datetime.date.fromisoformat(request.args[campo]) if request.args.get(campo) else None
+              for campo in ('desde', 'hasta'))
+        )
+    except ValueError as e:
+        return jsonify(error=f"Periodo inválido: {e}"), 400
+
+    with conexion() as conn:
+        cur = conn.cursor()
+        estado = estados.estado_de_cuenta(cur, id, desde, hasta)
+        cur.close()
+
+    if estado is None:
+        return "Cliente no encontrado", 404
+    if request.args.get('formato') == 'json':
+        return jsonify(estados.como_dict(estado))
+    return render_template('estado_cuenta.html', estado=estado)
+
+
+@bp.route('/clientes/importar', methods=['POST'])
+def importar_clientes():
+    return importacion.responder('clientes')
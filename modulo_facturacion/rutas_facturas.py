@@ -0,0 +1,174 @@
+import uuid
+
+from flask import Blueprint, current_app, render_template, request, redirect, url_for
+
+import cache
+import estados
+import idempotencia
+from db import conexion
+from inventario import ProductoNoEncontrado, StockInsuficiente, reservar_stock
+from preparadas import ejecutar
+
+bp = Blueprint('facturas', __name__)
+
+# Mayor valor de una columna INTEGER
+_MAX_ENTERO = 2 ** 31 - 1
+
+@bp.route('/')
+def index():
+    return redirect(url_for('facturas.listar_facturas'))
+
+@bp.route('/facturas')
+def listar_facturas():
+    with conexion() as conn:
+        cur = conn.cursor()
+        ejecutar(cur, 'listar_facturas')
+        facturas = cur.fetchall()
+        cur.close()
+    return render_template('facturas.html', facturas=facturas)
+
+def _consultar(nombre):
+    with conexion() as conn:
+        cur = conn.cursor()
+        ejecutar(cur, nombre)
+        filas = cur.fetchall()
+        cur.close()
+    return filas
+
+def _render_nueva_factura(error=None, status=200):
+    # Clientes y productos para los selectores, desde la caché compartida
+    clientes = cache.obtener('clientes', None, lambda: _consultar('opciones_clientes'))
+    productos = cache.obtener('productos', None, lambda: _consultar('opciones_productos'))
+
+    # Cada formulario lleva su clave: reenviarlo no crea otra factura
+    return render_template('nueva_factura.html', clientes=clientes, productos=productos, error=error,
+                           clave_idempotencia=uuid.uuid4().hex), status
+
+@bp.route('/factura/nueva', methods=['GET', 'POST'])
+def nueva_factura():
+    if request.method == 'POST':
+        # Un reintento ya atendido por este proceso no toca la base de datos
+        clave = idempotencia.clave_de(request)
+        if clave:
+            factura_id = idempotencia.en_memoria(clave)
+            if factura_id is not None:
+                return redirect(url_for('facturas.ver_factura', id=factura_id))
+
+        # Obtener datos del formulario
+        try:
+            cliente_id = int(request.form.get('cliente_id', ''))
+        except ValueError:
+            cliente_id = 0
+        if not 0 < cliente_id <= _MAX_ENTERO:
+            return _render_nueva_factura(error="Seleccione un cliente válido.", status=400)
+        items = []
+        total = 0
+        
+        # Procesar items; un producto repetido en varias líneas suma sus cantidades
+        lineas = []
+        cantidades = {}
+        for i in range(1, 6):  # Máximo 5 items por factura
+            producto_id = request.form.get(f'producto_id_{i}')
+            cantidad = request.form.get(f'cantidad_{i}')
+            if producto_id and cantidad:
+                try:
+                    producto_id, cantidad = int(producto_id), int(cantidad)
+                except ValueError:
+                    return _render_nueva_factura(
+                        error=f"Línea {i}: el producto y la cantidad deben ser números enteros.", status=400)
+                if not 0 < producto_id <= _MAX_ENTERO:
+                    return _render_nueva_factura(error=f"Línea {i}: producto no válido.", status=400)
+                if cantidad <= 0:
+                    return _render_nueva_factura(
+                        error=f"Línea {i}: la cantidad debe ser mayor que cero.", status=400)
+                if cantidad > _MAX_ENTERO:
+                    return _render_nueva_factura(error=f"Línea {i}: la cantidad es demasiado grande.", status=400)
+                lineas.append((producto_id, cantidad))
+                cantidades[producto_id] = cantidades.get(producto_id, 0) + cantidad
+
+        try:
+            with conexion() as conn:
+                cur = conn.cursor()
+
+                if clave:
+                    # Reintento atendido por otro proceso: devolver la factura original
+                    factura_id = idempotencia.reservar(cur, clave)
+                    if factura_id is not None:
+                        idempotencia.recordar(clave, factura_id)
+                        return redirect(url_for('facturas.ver_factura', id=factura_id))
+
+                # Antes de bloquear productos; salir del with deshace la reserva de la clave
+                ejecutar(cur, 'bloquear_cliente', (cliente_id,))
+                if cur.fetchone() is None:
+                    return _render_nueva_factura(error="Cliente no encontrado", status=400)
+
+                if current_app.config['INVENTARIO_ACTIVO']:
+                    # Bloquea los productos, valida y descuenta el stock; devuelve los precios
+                    precios = reservar_stock(cur, cantidades)
+                else:
+                    # Precios de todos los productos en una sola consulta
+                    ejecutar(cur, 'precios_productos', (sorted(cantidades),))
+                    precios = dict(cur.fetchall())
+                    if len(precios) != len(cantidades):
+                        raise ProductoNoEncontrado("Producto no encontrado")
+
+                for producto_id, cantidad in lineas:
+                    precio = precios[producto_id]
+                    subtotal = float(precio) * float(cantidad)
+                    items.append({
+                        'producto_id': producto_id,
+                        'cantidad': cantidad,
+                        'precio': precio,
+                        'subtotal': subtotal
+                    })
+                    total += subtotal
+
+                # Obtener el próximo número de factura de la secuencia
+                ejecutar(cur, 'siguiente_numero_factura')
+                numero_factura = f"FACT-{cur.fetchone()[0]}"
+
+                ejecutar(cur, 'insertar_factura', (numero_factura, cliente_id, total))
+                factura_id = cur.fetchone()[0]
+
+                # Insertar items de factura
+                for item in items:
+                    ejecutar(cur, 'insertar_factura_item',
+                             (factura_id, item['producto_id'], item['cantidad'], item['precio'], item['subtotal']))
+
+                if clave:
+                    idempotencia.completar(cur, clave, factura_id)
+
+                # Saldo del cliente para los estados de cuenta, en la misma transacción
+                estados.acumular(cur, [(factura_id, cliente_id)])
+
+                conn.commit()
+                cur.close()
+            if clave:
+                idempotencia.recordar(clave, factura_id)
+        except idempotencia.ClaveEnCurso:
+            return _render_nueva_factura(error="La factura con esta clave no se pudo recuperar.", status=409)
+        except StockInsuficiente as e:
+            return _render_nueva_factura(error=str(e), status=409)
+        except ProductoNoEncontrado as e:
+            return _render_nueva_factura(error=str(e), status=400)
+
+        return redirect(url_for('facturas.ver_factura', id=factura_id))
+    
+    return _render_nueva_factura()
+
+@bp.route('/factura/<int:id>')
+def ver_factura(id):
+    with conexion() as conn:
+        cur = conn.cursor()
+
+        # Obtener factura
+        ejecutar(cur, 'factura_cabecera', (id,))
+        factura = cur.fetchone()
+
+        # Obtener items
+        ejecutar(cur, 'factura_items', (id,))
+        items = cur.fetchall()
+
+        cur.close()
+    
+    return render_template('ver_factura.html', factura=factura, items=items)
@@ -0,0 +1,130 @@
+from flask import Blueprint, render_template, request, redirect, url_for
+import psycopg2
+
+import cache
+import importacion
+import listados
+import precios
+from db import conexion, get_db_connection
+from preparadas import ejecutar
+
+bp = Blueprint('productos', __name__)
+
+@bp.route('/productos')
+def listar_productos():
+    return listados.render_listado('productos', 'listar_productos.html', request.args)
+
+@bp.route('/productos/agregar', methods=['GET', 'POST'])
+def agregar_producto():
+    if request.method == 'POST':
+        nombre = request.form['nombre']
+        descripcion = request.form['descripcion']
+        precio = request.form['precio']
+
+        conn = get_db_connection()
+        cur = conn.cursor()
+        try:
+            cur.execute('INSERT INTO productos (nombre, descripcion, precio) VALUES (%s, %s, %s);', 
+                        (nombre, descripcion, precio))
+            cache.publicar(cur, 'productos')
+            conn.commit()
+        except psycopg2.errors.UniqueViolation:
+            # uq_productos_nombre: el nombre es la clave de la importación
+            conn.rollback()
+            return render_template('agregar_producto.html',
+                                   error="Ya existe un producto con ese nombre."), 409
+        finally:
+            cur.close()
+            conn.close()
+        return redirect(url_for('productos.listar_productos'))
+
+    return render_template('agregar_producto.html')
+
+@bp.route('/productos/editar/<int:id>', methods=['GET', 'POST'])
+def editar_producto(id):
+    conn = get_db_connection()
+    cur = conn.cursor()
+
+    if request.method == 'POST':
+        nombre = request.form['nombre']
+        descripcion = request.form['descripcion']
+        precio = request.form['precio']
+
+        try:
+            cur.execute('UPDATE productos SET nombre = %s, descripcion = %s, precio = %s WHERE id = %s;',
+                        (nombre, descripcion, precio, id))
+            cache.publicar(cur, 'productos', id)
+            conn.commit()
+        except psycopg2.errors.UniqueViolation:
+            conn.rollback()
+            return render_template('editar_producto.html', producto=(id, nombre, descripcion, precio),
+                                   error="Ya existe un producto con ese nombre."), 409
+        finally:
+            cur.close()
+            conn.close()
+        return redirect(url_for('productos.listar_productos'))
+
+    cur.execute('SELECT id, nombre, descripcion, precio FROM productos WHERE id = %s;', (id,))
+    producto = cur.fetchone()
+    cur.close()
+    conn.close()
+    return render_template('editar_producto.html', producto=producto)
+
+@bp.route('/productos/eliminar/<int:id>', methods=['POST'])
+def eliminar_producto(id):
+    with conexion() as conn:
+        cur = conn.cursor()
+
+        # Verificar si el producto aparece en alguna factura antes de eliminar
+        ejecutar(cur, 'producto_en_uso', (id,))
+        en_uso = cur.fetchone()[0]
+
+        if not en_uso:
+            try:
+                cur.execute('DELETE FROM productos WHERE id = %s;', (id,))
+                cache.publicar(cur, 'productos', id)
+                conn.commit()
+            except psycopg2.errors.ForeignKeyViolation:
+                conn.rollback()
+                en_uso = True
+        cur.close()
+
+    if en_uso:
+        return listados.render_listado('productos', 'listar_productos.html', request.form,
+                               error="No se puede eliminar el producto porque se encuentra en una factura.")
+
+    return redirect(url_for('productos.listar_productos', **listados.estado(request.form, 'productos')))
+
+@bp.route('/productos/precios', methods=['GET', 'POST'])
+def cambiar_precios():
+    # GET: formulario; POST accion=previsualizar: diferencias; POST accion=aplicar: cambio por lotes
+    datos = request.form if request.method == 'POST' else request.args
+    if request.method == 'GET':
+        return render_template('cambiar_precios.html', datos=datos)
+
+    try:
+        seleccion = precios.seleccion_de(datos)
+        regla = precios.regla_de(datos)
+        conn = get_db_connection()
+        try:
+            if datos.get('accion') == 'aplicar':
+                cambio_id, cambiados = precios.aplicar(conn, seleccion, regla)
+                return render_template('cambiar_precios.html', datos=datos, regla=precios.describir(regla),
+                                       resultado=(cambio_id, cambiados))
+            cur = conn.cursor()
+            vista = precios.previsualizar(cur, seleccion, regla)
+            cur.close()
+        finally:
+            conn.close()
+    except ValueError as e:
+        return render_template('cambiar_precios.html', datos=datos, error=str(e)), 400
+    except psycopg2.DataError:
+        # Algún precio nuevo no cabe en productos.precio; la vista previa falla antes de cambiar nada
+        return render_template('cambiar_precios.html', datos=datos,
+                               error="La regla deja precios fuera del rango permitido."), 400
+
+    return render_template('cambiar_precios.html', datos=datos, regla=precios.describir(regla), vista=vista)
+
+@bp.route('/productos/importar', methods=['POST'])
+def importar_productos():
+    return importacion.responder('productos')
@@ -0,0 +1,6 @@
+"""Pruebas sin base de datos de las funciones puras de los módulos."""
+import os
+import sys
+
+# Los módulos de la aplicación se importan por nombre desde modulo_facturacion/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,87 @@
+import datetime
+from decimal import Decimal
+
+import numpy as np
+import pytest
+
+import analitica
+
+D = datetime.date
+
+# (fecha, factura, cliente_id, producto_id, cantidad, subtotal en céntimos); ordenadas por fecha
+LINEAS = [
+    (D(2026, 1, 31), 1, 10, 100, 2, 1000),
+    (D(2026, 1, 31), 1, 10, 200, 1, 250),
+    (D(2026, 2, 1), 2, 20, 100, 1, 500),
+    (D(2026, 2, 15), 3, 10, 100, 3, 1500),
+    (D(2026, 2, 15), 3, 10, 100, 1, 500),
+    (D(2026, 3, 1), 4, 30, 300, 5, 5),
+]
+
+
+@pytest.fixture
+def instantanea(tmp_path):
+    ids = {'cliente': [], 'producto': []}
+    columnas = {nombre: [] for nombre in analitica.COLUMNAS}
+    for fecha, factura, cliente, producto, cantidad, subtotal in LINEAS:
+        for nombre, valor in (('cliente', cliente), ('producto', producto)):
+            if valor not in ids[nombre]:
+                ids[nombre].append(valor)
+        columnas['dia'].append((fecha - analitica._EPOCA).days)
+        columnas['factura'].append(factura)
+        columnas['cliente'].append(ids['cliente'].index(cliente))
+        columnas['producto'].append(ids['producto'].index(producto))
+        columnas['cantidad'].append(cantidad)
+        columnas['precio'].append(subtotal // cantidad)
+        columnas['subtotal'].append(subtotal)
+    for nombre, dtype in analitica.COLUMNAS.items():
+        np.array(columnas[nombre], dtype=dtype).tofile(analitica._ruta(tmp_path, nombre))
+    for nombre in analitica.DICCIONARIOS:
+        np.array(ids[nombre], dtype=np.int32).tofile(analitica._ruta(tmp_path, f"{nombre}_ids"))
+    analitica._escribir_meta(tmp_path, {
+        'filas': len(LINEAS), 'hasta': '2026-03-01T00:00:00', 'decimales': analitica.DECIMALES,
+        'diccionarios': {nombre: len(ids[nombre]) for nombre in analitica.DICCIONARIOS},
+    })
+    return analitica.Instantanea(tmp_path)
+
+
+def test_total(instantanea):
+    assert instantanea.consultar() == [analitica.Grupo(None, Decimal('37.55'), 13, 6, 4)]
+
+
+def test_por_producto(instantanea):
+    assert instantanea.consultar(agrupar='producto') == [
+        analitica.Grupo(100, Decimal('35.00'), 7, 4, 3),
+        analitica.Grupo(200, Decimal('2.50'), 1, 1, 1),
+        analitica.Grupo(300, Decimal('0.05'), 5, 1, 1),
+    ]
+
+
+def test_rango_de_fechas_inclusive(instantanea):
+    grupos = instantanea.consultar(D(2026, 2, 1), D(2026, 2, 15), agrupar='dia')
+    assert [(g.clave, g.importe, g.facturas) for g in grupos] == [
+        (D(2026, 2, 15), Decimal('20.00'), 1),
+        (D(2026, 2, 1), Decimal('5.00'), 1),
+    ]
+
+
+def test_por_mes_ordenado_por_cantidad(instantanea):
+    grupos = instantanea.consultar(agrupar='mes', orden='cantidad')
+    assert [(g.clave, g.cantidad) for g in grupos] == [('2026-02', 5), ('2026-03', 5), ('2026-01', 3)]
+
+
+def test_filtros_y_limite(instantanea):
+    grupos = instantanea.consultar(clientes=[10], productos=[100, 999], agrupar='cliente')
+    assert grupos == [analitica.Grupo(10, Decimal('30.00'), 6, 3, 2)]
+    assert instantanea.consultar(clientes=[999]) == []
+    assert [g.clave for g in instantanea.consultar(agrupar='cliente', limite=1)] == [10]
+
+
+def test_sin_filas_en_el_rango(instantanea):
+    assert instantanea.consultar(D(2027, 1, 1), D(2027, 12, 31), agrupar='producto') == []
+
+
+@pytest.mark.parametrize('opciones', [{'agrupar': 'factura'}, {'orden': 'clave'}])
+def test_opciones_invalidas(instantanea, opciones):
+    with pytest.raises(ValueError):
+        instantanea.consultar(**opciones)
@@ -0,0 +1,51 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip('quart')
+import app_async  # noqa: E402
+
+
+@pytest.mark.parametrize('ruta, lectura', [
+    ('/facturas', True),
+    ('/clientes/', True),
+    ('/productos', True),
+    ('/factura/15', True),
+    ('/factura/nueva', False),
+    ('/factura/15/editar', False),
+    ('/clientes/3/estado', False),
+    ('/productos/precios', False),
+    ('/', False),
+])
+def test_rutas_de_lectura(ruta, lectura):
+    assert bool(app_async._RUTAS_LECTURA.match(ruta)) is lectura
+
+
+@pytest.mark.parametrize('tipo, metodo, ruta, destino', [
+    ('http', 'GET', '/clientes', 'async'),
+    ('http', 'HEAD', '/factura/3', 'async'),
+    ('http', 'POST', '/clientes', 'sync'),
+    ('http', 'GET', '/factura/nueva', 'sync'),
+    ('lifespan', None, None, 'async'),
+])
+def test_aplicacion_reparte(monkeypatch, tipo, metodo, ruta, destino):
+    atendidas = []
+
+    def registrar(nombre):
+        async def atender(scope, receive, send):
+            atendidas.append(nombre)
+        return atender
+
+    monkeypatch.setattr(app_async, 'app', registrar('async'))
+    monkeypatch.setattr(app_async, '_app_sync_asgi', registrar('sync'))
+    scope = {'type': tipo, 'method': metodo, 'path': ruta}
+    asyncio.run(app_async.aplicacion(scope, None, None))
+    assert atendidas == [destino]
+
+
+def test_url_for_de_rutas_sincronas():
+    async def construir():
+        async with app_async.app.test_request_context('/clientes'):
+            return app_async.app.url_for('facturas.nueva_factura'), app_async.app.url_for('clientes.editar_cliente', id=4)
+
+    assert asyncio.run(construir()) == ('/factura/nueva', '/clientes/4/editar')
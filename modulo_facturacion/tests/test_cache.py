@@ -0,0 +1,63 @@
+import pytest
+
+import cache
+
+
+@pytest.fixture
+def escuchando(monkeypatch):
+    # Como si el hilo de escucha estuviera conectado, sin conectarse
+    monkeypatch.setattr(cache, '_iniciar_escucha', lambda: None)
+    monkeypatch.setattr(cache, '_datos', {})
+    cache._escuchando.set()
+    yield
+    cache._escuchando.clear()
+
+
+def test_guarda_lo_cargado(escuchando):
+    cargas = []
+    assert cache.obtener('productos', None, lambda: cargas.append(1) or 'lista') == 'lista'
+    assert cache.obtener('productos', None, lambda: cargas.append(2) or 'otra') == 'lista'
+    assert cargas == [1]
+
+
+def test_sin_escucha_no_guarda(escuchando):
+    cache._escuchando.clear()
+    cache.obtener('productos', None, lambda: 'lista')
+    assert cache._datos == {}
+
+
+def test_un_aviso_durante_la_carga_descarta_el_valor(escuchando):
+    def cargar():
+        cache._procesar('productos')
+        return 'vieja'
+    assert cache.obtener('productos', None, cargar) == 'vieja'
+    assert ('productos', None) not in cache._datos
+
+
+@pytest.mark.parametrize('carga, desalojadas', [
+    ('productos', {('productos', None)}),
+    ('productos:7', {('productos', None), ('productos', 7)}),
+    ('clientes:ana@example.com', {('clientes', None), ('clientes', 'ana@example.com')}),
+])
+def test_procesar(escuchando, carga, desalojadas):
+    claves = [('productos', None), ('productos', 7), ('productos', 8),
+              ('clientes', None), ('clientes', 'ana@example.com')]
+    cache._datos.update(dict.fromkeys(claves, 'x'))
+    cache._procesar(carga)
+    assert set(claves) - set(cache._datos) == desalojadas
+
+
+class Cursor:
+    def __init__(self):
+        self.sentencias = []
+
+    def execute(self, sql, params):
+        self.sentencias.append((sql, params))
+
+
+def test_publicar_notifica_y_desaloja(escuchando):
+    cache._datos[('productos', 3)] = 'x'
+    cur = Cursor()
+    cache.publicar(cur, 'productos', 3)
+    assert cur.sentencias == [('SELECT pg_notify(%s, %s);', (cache.CANAL, 'productos:3'))]
+    assert cache._datos == {}
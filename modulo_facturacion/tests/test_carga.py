@@ -0,0 +1,60 @@
+import argparse
+
+import pytest
+
+from benchmarks import carga
+
+
+class ClienteFalso:
+    """Devuelve las páginas de `paginas` por número; más allá, repite la última."""
+
+    def __init__(self, paginas):
+        self.paginas = paginas
+        self.pedidas = []
+
+    def pedir(self, metodo, ruta):
+        ruta, _, pagina = ruta.partition('?pagina=')
+        self.pedidas.append((ruta, int(pagina)))
+        html = self.paginas.get(ruta, [''])
+        return 200, '', html[min(int(pagina), len(html)) - 1]
+
+
+def _enlaces(plantilla, ids, siguiente=True):
+    return ''.join(f'<a href="{plantilla.format(i)}">' for i in ids) + ('<a>Siguiente</a>' if siguiente else '')
+
+
+def test_descubrir_sigue_las_paginas():
+    cliente = ClienteFalso({'/clientes': [
+        _enlaces('/clientes/{}/editar', [1, 2]),
+        _enlaces('/clientes/{}/editar', [3], siguiente=False),
+    ]})
+    datos = carga.Datos()
+    datos.descubrir(cliente)
+    assert datos.clientes == [1, 2, 3]
+    assert [p for r, p in cliente.pedidas if r == '/clientes'] == [1, 2]
+
+
+def test_descubrir_termina_si_el_servidor_repite_la_ultima_pagina():
+    # Con la página limitada en el servidor, la última sigue mostrando "Siguiente"
+    cliente = ClienteFalso({'/productos': [
+        _enlaces('/productos/editar/{}', [1, 1, 2]),
+        _enlaces('/productos/editar/{}', [3]),
+    ]})
+    datos = carga.Datos()
+    datos.descubrir(cliente)
+    assert datos.productos == [1, 2, 3]
+    assert [p for r, p in cliente.pedidas if r == '/productos'] == [1, 2, 3]
+
+
+def test_mezcla():
+    assert carga._mezcla('listar=40, ver=35,crear') == {'listar': 40.0, 'ver': 35.0, 'crear': 1.0}
+    with pytest.raises(argparse.ArgumentTypeError):
+        carga._mezcla('listar=1,borrar=2')
+
+
+def test_percentil():
+    ordenadas = list(range(1, 101))
+    assert carga._percentil(ordenadas, 50) == 51
+    assert carga._percentil(ordenadas, 99) == 100
+    assert carga._percentil(ordenadas, 100) == 100
+    assert carga._percentil([7], 95) == 7
@@ -0,0 +1,59 @@
+import datetime
+import json
+from decimal import Decimal
+
+import pytest
+
+import estados
+
+
+class _Hoy(datetime.date):
+    @classmethod
+    def today(cls):
+        return cls(2024, 3, 15)
+
+
+def test_periodo_por_defecto(monkeypatch):
+    monkeypatch.setattr(estados.datetime, 'date', _Hoy)
+    assert estados.periodo() == (_Hoy(2024, 3, 1), _Hoy(2024, 3, 15))
+    assert estados.periodo(hasta=datetime.date(2024, 2, 20)) == (datetime.date(2024, 2, 1), datetime.date(2024, 2, 20))
+
+
+def test_periodo_invalido():
+    with pytest.raises(ValueError):
+        estados.periodo(datetime.date(2024, 3, 2), datetime.date(2024, 3, 1))
+    with pytest.raises(ValueError):
+        estados.periodo(datetime.date(2024, 3, 1), datetime.date.max)
+    ultimo = datetime.date.max - datetime.timedelta(days=1)
+    assert estados.periodo(datetime.date(2024, 3, 1), ultimo) == (datetime.date(2024, 3, 1), ultimo)
+
+
+def test_como_dict():
+    fecha = datetime.datetime(2024, 3, 5, 10, 30)
+    estado = estados.Estado(
+        cliente=(7, 'Ana', 'Calle 1', '555', 'ana@example.com'),
+        desde=datetime.date(2024, 3, 1), hasta=datetime.date(2024, 3, 31),
+        saldo_inicial=Decimal('100.10'),
+        movimientos=[estados.Movimiento(42, 'FACT-42', fecha, Decimal('0.20'), Decimal('100.30'))],
+        total=Decimal('0.20'), saldo_final=Decimal('100.30'),
+    )
+    datos = estados.como_dict(estado)
+    assert datos == {
+        'cliente': {'id': 7, 'nombre': 'Ana', 'email': 'ana@example.com'},
+        'desde': '2024-03-01',
+        'hasta': '2024-03-31',
+        'saldo_inicial': '100.10',
+        'movimientos': [{'factura_id': 42, 'numero': 'FACT-42', 'fecha': '2024-03-05T10:30:00',
+                         'importe': '0.20', 'saldo': '100.30'}],
+        'total': '0.20',
+        'saldo_final': '100.30',
+    }
+    json.dumps(datos)
+
+
+def test_acumular_sin_facturas_no_consulta():
+    class Cursor:
+        def execute(self, *args):
+            raise AssertionError("no debería consultar")
+
+    estados.acumular(Cursor(), [])
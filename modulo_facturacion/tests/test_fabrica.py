@@ -0,0 +1,75 @@
+import os
+
+import pytest
+
+import db
+import fabrica
+import perfilador
+
+
+@pytest.fixture(autouse=True)
+def entorno(monkeypatch):
+    # create_app() y configurar_desde_entorno() cambian db.DB_CONFIG en su lugar
+    monkeypatch.setattr(db, 'DB_CONFIG', dict(db.DB_CONFIG))
+    monkeypatch.setattr(db, 'POOL_MIN', db.POOL_MIN)
+    monkeypatch.setattr(db, 'POOL_MAX', db.POOL_MAX)
+    for nombre in list(os.environ):
+        if nombre.startswith('FACTURACION_'):
+            monkeypatch.delenv(nombre)
+
+
+def test_valores_por_defecto():
+    config = fabrica.cargar_configuracion()
+    for clave, valor in fabrica.DEFAULTS.items():
+        assert config[clave] == valor
+
+
+def test_variables_con_prefijo(monkeypatch):
+    monkeypatch.setenv('FACTURACION_DB_CONFIG__host', 'db1')
+    monkeypatch.setenv('FACTURACION_INVENTARIO_ACTIVO', 'true')
+    monkeypatch.setenv('FACTURACION_PERFIL_MUESTREO', '0.05')
+    config = fabrica.cargar_configuracion({'POOL_MAX': 3})
+    assert config['DB_CONFIG']['host'] == 'db1'
+    assert config['INVENTARIO_ACTIVO'] is True
+    assert config['PERFIL_MUESTREO'] == 0.05
+    assert config['POOL_MAX'] == 3
+    # Los valores por defecto no se tocan
+    assert fabrica.DEFAULTS['DB_CONFIG']['host'] == 'localhost'
+
+
+def test_las_variables_sin_prefijo_no_cuentan(monkeypatch):
+    monkeypatch.setenv('PERFIL_TOKEN', 'secreto')
+    assert fabrica.cargar_configuracion()['PERFIL_TOKEN'] == ''
+
+
+def test_configurar_desde_entorno(monkeypatch):
+    monkeypatch.setenv('FACTURACION_DB_CONFIG__database', 'otra')
+    config = fabrica.configurar_desde_entorno()
+    assert db.DB_CONFIG['database'] == config['DB_CONFIG']['database'] == 'otra'
+
+
+def test_create_app_no_conecta(monkeypatch):
+    monkeypatch.setenv('FACTURACION_DB_CONFIG__database', 'otra')
+    app = fabrica.create_app({'POOL_MIN': 2})
+    assert db.DB_CONFIG['database'] == 'otra' and db.POOL_MIN == 2
+    assert db._pool is None
+    assert {'facturas', 'clientes', 'productos'} <= set(app.blueprints)
+
+
+@pytest.mark.parametrize('valor, cabecera, perfilada', [
+    # Desde el entorno un token numérico llega como int
+    ('12345', '12345', True),
+    ('12345', '1234', False),
+    ('"secreto"', 'ñandú', False),
+])
+def test_token_del_entorno(monkeypatch, tmp_path, valor, cabecera, perfilada):
+    monkeypatch.setenv('FACTURACION_PERFIL_TOKEN', valor)
+    monkeypatch.setenv('FACTURACION_PERFIL_DIR', str(tmp_path))
+    app = fabrica.create_app()
+
+    @app.route('/prueba-perfil')
+    def prueba():
+        return 'ok'
+
+    assert app.test_client().get('/prueba-perfil', headers={perfilador.CABECERA: cabecera}).status_code == 200
+    assert bool(list(tmp_path.glob('*.folded'))) is perfilada
@@ -0,0 +1,53 @@
+import pytest
+
+import idempotencia
+
+
+class Reloj:
+    def __init__(self):
+        self.ahora = 1000.0
+
+    def __call__(self):
+        return self.ahora
+
+
+@pytest.fixture
+def reloj(monkeypatch):
+    reloj = Reloj()
+    monkeypatch.setattr(idempotencia.time, 'monotonic', reloj)
+    monkeypatch.setattr(idempotencia, '_memoria', type(idempotencia._memoria)())
+    return reloj
+
+
+def test_recordar_y_consultar(reloj):
+    assert idempotencia.en_memoria('a') is None
+    idempotencia.recordar('a', 7)
+    assert idempotencia.en_memoria('a') == 7
+
+
+def test_caduca_tras_la_retencion(reloj):
+    idempotencia.recordar('a', 7)
+    reloj.ahora += idempotencia.RETENCION
+    assert idempotencia.en_memoria('a') == 7
+    reloj.ahora += 1
+    assert idempotencia.en_memoria('a') is None
+    assert 'a' not in idempotencia._memoria
+
+
+def test_descarta_la_menos_usada(reloj, monkeypatch):
+    monkeypatch.setattr(idempotencia, 'MAX_MEMORIA', 2)
+    idempotencia.recordar('a', 1)
+    idempotencia.recordar('b', 2)
+    # Consultar 'a' la vuelve la más reciente: sale 'b'
+    assert idempotencia.en_memoria('a') == 1
+    idempotencia.recordar('c', 3)
+    assert list(idempotencia._memoria) == ['a', 'c']
+    assert idempotencia.en_memoria('b') is None
+
+
+def test_recordar_de_nuevo_renueva(reloj):
+    idempotencia.recordar('a', 1)
+    reloj.ahora += idempotencia.RETENCION
+    idempotencia.recordar('a', 1)
+    reloj.ahora += idempotencia.RETENCION
+    assert idempotencia.en_memoria('a') == 1
@@ -0,0 +1,68 @@
+import io
+
+import pytest
+
+import importacion
+
+
+@pytest.mark.parametrize('archivo', [
+    io.StringIO(' Nombre ,EMAIL, telefono\nx,y,z\n'),
+    io.BytesIO(b' Nombre ,EMAIL, telefono\r\nx,y,z\r\n'),
+    io.BytesIO('\ufeffNombre,Email,Telefono\n'.encode('utf-8')),
+])
+def test_encabezado(archivo):
+    assert importacion._encabezado(archivo) == ['nombre', 'email', 'telefono']
+
+
+def test_encabezado_entrecomillado():
+    assert importacion._encabezado(io.StringIO('"nombre","descripcion, larga"\n')) == ['nombre', 'descripcion, larga']
+
+
+def test_encabezado_vacio():
+    assert importacion._encabezado(io.BytesIO(b'')) == []
+
+
+def test_encabezado_deja_el_archivo_en_los_datos():
+    archivo = io.BytesIO(b'nombre,precio\nclavo,0.10\n')
+    importacion._encabezado(archivo)
+    assert archivo.read() == b'clavo,0.10\n'
+
+
+@pytest.mark.parametrize('columnas, mensaje', [
+    (['nombre', 'nombre', 'descripcion', 'precio'], "Columnas repetidas: nombre"),
+    (['nombre', 'descripcion', 'precio', 'stock'], "Columnas desconocidas: stock"),
+    (['nombre', 'precio'], "Faltan columnas: descripcion"),
+])
+def test_encabezado_invalido(columnas, mensaje):
+    with pytest.raises(importacion.ArchivoInvalido, match=mensaje):
+        importacion._validar_encabezado(importacion.ENTIDADES['productos'], columnas)
+
+
+def test_encabezado_valido_en_cualquier_orden():
+    importacion._validar_encabezado(importacion.ENTIDADES['clientes'], ['email', 'telefono', 'direccion', 'nombre'])
+
+
+@pytest.mark.parametrize('valor, esperado', [
+    ('1', True), ('true', True), (' Sí ', True), ('0', False), ('false', False), ('no', False), ('', False),
+])
+def test_solo_validar(valor, esperado):
+    assert importacion._solo_validar({'validar': valor}) is esperado
+    assert importacion._solo_validar({}) is False
+
+
+def test_volcado_marca_filas_con_otro_numero_de_columnas():
+    archivo = io.BytesIO(b'nombre,descripcion,precio\na,b,1\n\nc,d\ne,f,2,3\n')
+    columnas = importacion._encabezado(archivo)
+    with importacion._volcado(archivo, columnas) as volcado:
+        assert volcado.read().splitlines() == [
+            '2,a,b,1,',
+            '4,,,,se esperaban 3 columnas y hay 2',
+            '5,,,,se esperaban 3 columnas y hay 4',
+        ]
+
+
+def test_volcado_rechaza_otra_codificacion():
+    archivo = io.BytesIO('nombre,descripcion,precio\ncañón,b,1\n'.encode('latin-1'))
+    columnas = importacion._encabezado(archivo)
+    with pytest.raises(importacion.ArchivoInvalido, match="UTF-8"):
+        importacion._volcado(archivo, columnas)
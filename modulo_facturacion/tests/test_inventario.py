@@ -0,0 +1,62 @@
+from decimal import Decimal
+
+import pytest
+
+import inventario
+
+
+class Cursor:
+    """Devuelve `productos` (id, precio, stock) al bloquear y cuenta las filas descontadas."""
+
+    def __init__(self, productos, descontadas=None):
+        self.productos = productos
+        self.descontadas = descontadas
+        self.llamadas = []
+        self.rowcount = 0
+
+    def fetchall(self):
+        return self.filas
+
+
+@pytest.fixture
+def ejecutadas(monkeypatch):
+    def ejecutar(cur, nombre, params=()):
+        cur.llamadas.append((nombre, params))
+        if nombre == 'bloquear_productos':
+            cur.filas = [p for p in cur.productos if p[0] in params[0]]
+        else:
+            cur.rowcount = len(params[0]) if cur.descontadas is None else cur.descontadas
+    monkeypatch.setattr(inventario, 'ejecutar', ejecutar)
+
+
+def test_mensaje_de_stock_insuficiente():
+    e = inventario.StockInsuficiente({7: (5, 2), 3: (1, None)})
+    assert str(e) == "Stock insuficiente (producto 3: pedido 1, disponible None, producto 7: pedido 5, disponible 2)"
+    assert e.faltantes == {7: (5, 2), 3: (1, None)}
+
+
+def test_reserva_en_orden_de_id(ejecutadas):
+    cur = Cursor([(2, Decimal('1.50'), 10), (9, Decimal('3.00'), 1)])
+    assert inventario.reservar_stock(cur, {9: 1, 2: 4}) == {2: Decimal('1.50'), 9: Decimal('3.00')}
+    assert cur.llamadas == [('bloquear_productos', ([2, 9],)), ('descontar_stock', ([2, 9], [4, 1]))]
+
+
+def test_falta_stock_no_descuenta(ejecutadas):
+    cur = Cursor([(2, Decimal('1.50'), 3), (9, Decimal('3.00'), None)])
+    with pytest.raises(inventario.StockInsuficiente) as e:
+        inventario.reservar_stock(cur, {2: 4, 9: 1})
+    assert e.value.faltantes == {2: (4, 3), 9: (1, None)}
+    assert [nombre for nombre, _ in cur.llamadas] == ['bloquear_productos']
+
+
+def test_producto_inexistente(ejecutadas):
+    cur = Cursor([(2, Decimal('1.50'), 3)])
+    with pytest.raises(inventario.ProductoNoEncontrado, match=r"\[5\]"):
+        inventario.reservar_stock(cur, {2: 1, 5: 1})
+    assert [nombre for nombre, _ in cur.llamadas] == ['bloquear_productos']
+
+
+def test_descuento_incompleto(ejecutadas):
+    cur = Cursor([(2, Decimal('1.50'), 3), (9, Decimal('3.00'), 5)], descontadas=1)
+    with pytest.raises(inventario.StockInsuficiente):
+        inventario.reservar_stock(cur, {2: 1, 9: 1})
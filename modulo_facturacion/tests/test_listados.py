@@ -0,0 +1,38 @@
+import pytest
+
+import listados
+
+
+@pytest.mark.parametrize('pagina, esperada', [
+    ('3', 3),
+    (' 4 ', 4),
+    ('0', 1),
+    ('-2', 1),
+    ('', 1),
+    ('abc', 1),
+    ('1.5', 1),
+    ('²', 1),
+    ('99999999999', listados.MAX_PAGINA),
+])
+def test_pagina(pagina, esperada):
+    assert listados.parametros({'pagina': pagina}, 'clientes')[0] == esperada
+
+
+def test_valores_por_defecto():
+    assert listados.parametros({}, 'productos') == (1, '', 'nombre', 'asc')
+
+
+def test_orden_y_direccion():
+    datos = {'q': '  ana ', 'orden': 'email', 'dir': 'desc'}
+    assert listados.parametros(datos, 'clientes') == (1, 'ana', 'email', 'desc')
+    # email no es un orden de productos; dir solo admite desc
+    assert listados.parametros({'orden': 'email', 'dir': 'DESC; DROP'}, 'productos') == (1, '', 'nombre', 'asc')
+
+
+def test_la_ultima_pagina_cabe_en_el_offset():
+    _, params = listados.sentencia('clientes', listados.MAX_PAGINA)
+    assert params[1] < 2 ** 31
+
+
+def test_patron_escapa_comodines():
+    assert listados.patron('50%_a\\b') == '%50\\%\\_a\\\\b%'
@@ -0,0 +1,60 @@
+import flask
+import pytest
+
+import perfilador
+
+
+def test_guardar_en_pilas_colapsadas(tmp_path):
+    perfil = perfilador.Perfil()
+    perfil.tiempos[('app.vista', 'db.consultar')] = 0.0125
+    perfil.tiempos[('app.vista', 'modulo.a;b')] = 0.000002
+    perfil.tiempos[('app.vista',)] = 0.0000004  # menos de un microsegundo: se omite
+    ruta = perfil.guardar(tmp_path / 'perfiles', 'peticion')
+    assert ruta == str(tmp_path / 'perfiles' / 'peticion.folded')
+    with open(ruta, encoding='utf-8') as f:
+        assert f.read().splitlines() == ['app.vista;db.consultar 12500', 'app.vista;modulo.a:b 2']
+
+
+def _funcion_perfilada():
+    return sorted([3, 1, 2])
+
+
+def test_registra_llamadas_python_y_c():
+    perfil = perfilador.Perfil()
+    perfil.iniciar()
+    try:
+        _funcion_perfilada()
+    finally:
+        perfil.detener()
+    pilas = {';'.join(pila) for pila in perfil.tiempos}
+    assert 'test_perfilador._funcion_perfilada' in pilas
+    assert 'test_perfilador._funcion_perfilada;builtins.sorted' in pilas
+
+
+def _app(**config):
+    app = flask.Flask(__name__)
+    app.config.update(config)
+    perfilador.registrar_perfilador(app)
+    return app
+
+
+def test_sin_token_ni_muestreo_no_registra_hooks():
+    app = _app(PERFIL_TOKEN='', PERFIL_MUESTREO=0)
+    assert not app.before_request_funcs and not app.teardown_request_funcs
+
+
+@pytest.mark.parametrize('token, cabecera, esperado', [
+    ('secreto', 'secreto', True),
+    ('secreto', 'otro', False),
+    ('secreto', None, False),
+])
+def test_token(tmp_path, token, cabecera, esperado):
+    app = _app(PERFIL_TOKEN=token, PERFIL_DIR=str(tmp_path))
+
+    @app.route('/')
+    def raiz():
+        return 'ok'
+
+    cabeceras = {} if cabecera is None else {perfilador.CABECERA: cabecera}
+    assert app.test_client().get('/', headers=cabeceras).status_code == 200
+    assert bool(list(tmp_path.glob('*.folded'))) is esperado
@@ -0,0 +1,104 @@
+from decimal import Decimal
+
+import pytest
+
+import precios
+
+
+def _nuevo(precio, regla):
+    # La misma cuenta que _NUEVO en SQL: round() de PostgreSQL redondea la mitad hacia arriba
+    p = precios._parametros(regla)
+    cociente = (precio * p['factor'] + p['suma']) / p['multiplo']
+    return (cociente.quantize(Decimal('1'), 'ROUND_HALF_UP') * p['multiplo']).quantize(Decimal('0.01'))
+
+
+def test_regla_por_defecto():
+    assert precios.regla_de({}) == precios.Regla('porcentaje', Decimal('0'), Decimal('0.01'))
+
+
+def test_regla_acepta_coma_decimal():
+    regla = precios.regla_de({'tipo': 'absoluto', 'valor': ' -1,50 ', 'redondeo': '0,05'})
+    assert regla == precios.Regla('absoluto', Decimal('-1.50'), Decimal('0.05'))
+
+
+def test_redondeo_cero_es_al_centimo():
+    assert precios.regla_de({'redondeo': '0'}).redondeo == Decimal('0.01')
+
+
+@pytest.mark.parametrize('datos', [
+    {'tipo': 'otro'},
+    {'valor': 'diez'},
+    {'redondeo': '-0.10'},
+    {'tipo': 'porcentaje', 'valor': '-100'},
+    {'tipo': 'porcentaje', 'valor': '1000.01'},
+    {'tipo': 'porcentaje', 'valor': 'NaN'},
+    {'tipo': 'absoluto', 'valor': 'sNaN'},
+    {'tipo': 'absoluto', 'valor': '-Infinity'},
+    {'tipo': 'absoluto', 'valor': '1e12'},
+    {'redondeo': 'inf'},
+    {'redondeo': '100000000'},
+])
+def test_regla_invalida(datos):
+    with pytest.raises(ValueError):
+        precios.regla_de(datos)
+
+
+def test_seleccion():
+    seleccion = precios.seleccion_de({'ids': '3, 1 3,2', 'q': '  tornillo ', 'precio_min': '1,5'})
+    assert seleccion == precios.Seleccion([1, 2, 3], 'tornillo', Decimal('1.5'), None)
+
+
+def test_limites_aceptados():
+    assert precios.regla_de({'tipo': 'porcentaje', 'valor': '1000'}).valor == precios.PORCENTAJE_MAXIMO
+    assert precios.regla_de({'tipo': 'absoluto', 'valor': '-99999999.99'}).valor == -precios.MAXIMO
+    assert precios.seleccion_de({'precio_max': '99999999.99'}).precio_max == precios.MAXIMO
+
+
+def test_seleccion_vacia():
+    assert precios.seleccion_de({}) == precios.Seleccion(None, '', None, None)
+
+
+@pytest.mark.parametrize('datos', [
+    {'ids': '1,a'},
+    {'ids': '-1'},
+    {'precio_max': 'x'},
+    {'precio_min': 'NaN'},
+    {'precio_max': '1E+9'},
+])
+def test_seleccion_invalida(datos):
+    with pytest.raises(ValueError):
+        precios.seleccion_de(datos)
+
+
+def test_filtro():
+    filtro, params = precios._filtro(precios.Seleccion([1, 2], '50%', None, Decimal('10')))
+    assert filtro == 'id = ANY(%(ids)s) AND (nombre ILIKE %(q)s OR descripcion ILIKE %(q)s) AND precio <= %(precio_max)s'
+    assert params == {'ids': [1, 2], 'q': '%50\\%%', 'precio_max': Decimal('10')}
+    assert precios._filtro(precios.Seleccion(None, '', None, None)) == ('TRUE', {})
+
+
+@pytest.mark.parametrize('datos, precio, esperado', [
+    ({'tipo': 'porcentaje', 'valor': '10'}, Decimal('19.99'), Decimal('21.99')),
+    ({'tipo': 'porcentaje', 'valor': '5', 'redondeo': '0.10'}, Decimal('10.00'), Decimal('10.50')),
+    ({'tipo': 'porcentaje', 'valor': '-20', 'redondeo': '1'}, Decimal('9.99'), Decimal('8.00')),
+    ({'tipo': 'absoluto', 'valor': '2,5'}, Decimal('10.00'), Decimal('12.50')),
+    ({'tipo': 'redondeo', 'valor': '7', 'redondeo': '0.05'}, Decimal('10.03'), Decimal('10.05')),
+])
+def test_parametros(datos, precio, esperado):
+    assert _nuevo(precio, precios.regla_de(datos)) == esperado
+
+
+def test_parametros_solo_redondeo_ignora_valor():
+    assert precios._parametros(precios.regla_de({'tipo': 'redondeo', 'valor': '7'})) == {
+        'factor': Decimal('1'), 'suma': Decimal('0'), 'multiplo': Decimal('0.01'),
+    }
+
+
+def test_nuevo_usa_los_parametros():
+    for nombre in precios._parametros(precios.regla_de({})):
+        assert f"%({nombre})s" in precios._NUEVO
+
+
+def test_describir():
+    assert precios.describir(precios.regla_de({'valor': '5', 'redondeo': '0.10'})) == "+5%, redondeo a 0.10"
+    assert precios.describir(precios.regla_de({'tipo': 'absoluto', 'valor': '-2'})) == "-2 por unidad, redondeo a 0.01"
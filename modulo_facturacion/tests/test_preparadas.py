@@ -0,0 +1,92 @@
+import re
+
+import pytest
+from psycopg2 import errors as pg_errors
+from psycopg2 import extensions
+
+import estados  # noqa: F401  (registra sus sentencias)
+import idempotencia  # noqa: F401
+import inventario  # noqa: F401
+import preparadas
+
+
+class Conexion:
+    def __init__(self, estado=extensions.TRANSACTION_STATUS_IDLE):
+        self.preparadas = set()
+        self.info = type('Info', (), {'transaction_status': estado})()
+        self.rollbacks = 0
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+class Cursor:
+    """Registra lo ejecutado; `fallar` es la cantidad de EXECUTE que fallan antes de funcionar."""
+
+    def __init__(self, conn, fallar=0):
+        self.connection = conn
+        self.fallar = fallar
+        self.sentencias = []
+
+    def execute(self, sql, params=None):
+        if sql.startswith('EXECUTE') and self.fallar:
+            self.fallar -= 1
+            raise pg_errors.InvalidSqlStatementName('la sentencia no existe')
+        self.sentencias.append(sql if params is None else (sql, params))
+
+
+def test_execute_sql():
+    assert preparadas._execute_sql('siguiente_numero_factura', 0) == 'EXECUTE siguiente_numero_factura'
+    assert preparadas._execute_sql('insertar_factura', 3) == 'EXECUTE insertar_factura (%s, %s, %s)'
+
+
+@pytest.mark.parametrize('nombre', sorted(preparadas.SENTENCIAS))
+def test_tipos_por_parametro(nombre):
+    sql, tipos = preparadas.SENTENCIAS[nombre]
+    usados = {int(n) for n in re.findall(r'\$(\d+)', sql)}
+    assert usados == set(range(1, len(tipos) + 1))
+
+
+def test_prepara_una_vez_por_conexion():
+    conn = Conexion()
+    cur = Cursor(conn)
+    preparadas.ejecutar(cur, 'precios_productos', ([1, 2],))
+    preparadas.ejecutar(cur, 'precios_productos', ([3],))
+    assert cur.sentencias == [
+        'PREPARE precios_productos (integer[]) AS SELECT id, precio FROM productos WHERE id = ANY($1)',
+        ('EXECUTE precios_productos (%s)', ([1, 2],)),
+        ('EXECUTE precios_productos (%s)', ([3],)),
+    ]
+    assert conn.preparadas == {'precios_productos'}
+
+
+def test_estado_desconocido_empieza_de_cero():
+    conn = Conexion()
+    conn.preparadas = None
+    cur = Cursor(conn)
+    preparadas.ejecutar(cur, 'siguiente_numero_factura')
+    assert cur.sentencias[0] == 'DEALLOCATE ALL'
+    assert conn.preparadas == {'siguiente_numero_factura'}
+
+
+def test_sin_transaccion_vuelve_a_preparar():
+    conn = Conexion()
+    conn.preparadas = {'siguiente_numero_factura'}
+    cur = Cursor(conn, fallar=1)
+    preparadas.ejecutar(cur, 'siguiente_numero_factura')
+    assert conn.rollbacks == 1
+    assert cur.sentencias == [
+        'DEALLOCATE ALL',
+        "PREPARE siguiente_numero_factura AS SELECT nextval('factura_numero_seq')",
+        ('EXECUTE siguiente_numero_factura', ()),
+    ]
+
+
+def test_dentro_de_una_transaccion_propaga_el_error():
+    conn = Conexion(extensions.TRANSACTION_STATUS_INTRANS)
+    conn.preparadas = {'siguiente_numero_factura'}
+    cur = Cursor(conn, fallar=1)
+    with pytest.raises(pg_errors.InvalidSqlStatementName):
+        preparadas.ejecutar(cur, 'siguiente_numero_factura')
+    # La próxima vez se re-prepara todo
+    assert conn.preparadas is None and conn.rollbacks == 0
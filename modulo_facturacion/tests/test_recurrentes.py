@@ -0,0 +1,42 @@
+from collections import defaultdict
+from decimal import Decimal
+
+import recurrentes
+
+P = Decimal('2.00')
+
+
+def _items(lineas):
+    # {recurrente_id: [(producto_id, cantidad)]} -> formato de _procesar_lote
+    items = defaultdict(list)
+    for recurrente_id, productos in lineas.items():
+        items[recurrente_id] = [(pid, cantidad, P, P * cantidad) for pid, cantidad in productos]
+    return items
+
+
+def _definiciones(*ids):
+    return [(i, 100 + i, None) for i in ids]
+
+
+def test_asigna_en_orden_de_id():
+    items = _items({1: [(10, 3)], 2: [(10, 3)], 3: [(10, 2)]})
+    stock = {10: 5}
+    aceptadas = recurrentes._con_stock(_definiciones(1, 2, 3), items, stock)
+    # La 2 no cabe tras la 1; la 3 sí
+    assert [d[0] for d in aceptadas] == [1, 3]
+    assert stock == {10: 0}
+
+
+def test_suma_lineas_repetidas_de_una_definicion():
+    items = _items({1: [(10, 2), (10, 2), (20, 1)]})
+    stock = {10: 3, 20: 5}
+    assert recurrentes._con_stock(_definiciones(1), items, stock) == []
+    # Sin asignar no se descuenta nada
+    assert stock == {10: 3, 20: 5}
+
+
+def test_todo_o_nada_por_definicion():
+    items = _items({1: [(10, 1), (20, 1)], 2: [(10, 1)]})
+    stock = {10: 2, 20: 0}
+    assert [d[0] for d in recurrentes._con_stock(_definiciones(1, 2), items, stock)] == [2]
+    assert stock == {10: 1, 20: 0}
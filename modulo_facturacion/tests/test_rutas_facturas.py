@@ -0,0 +1,31 @@
+import pytest
+
+import db
+import rutas_facturas
+from fabrica import create_app
+
+
+@pytest.fixture
+def cliente(monkeypatch):
+    # El formulario con el error, sin consultar clientes ni productos
+    monkeypatch.setattr(rutas_facturas, '_render_nueva_factura', lambda error=None, status=200: (error or '', status))
+    monkeypatch.setattr(db, 'DB_CONFIG', dict(db.DB_CONFIG))
+    return create_app({'TESTING': True}).test_client()
+
+
+@pytest.mark.parametrize('datos, mensaje', [
+    ({'producto_id_1': '1', 'cantidad_1': '1'}, "Seleccione un cliente válido."),
+    ({'cliente_id': 'abc', 'producto_id_1': '1', 'cantidad_1': '1'}, "Seleccione un cliente válido."),
+    ({'cliente_id': '2147483648', 'producto_id_1': '1', 'cantidad_1': '1'}, "Seleccione un cliente válido."),
+    ({'cliente_id': '1', 'producto_id_1': '1', 'cantidad_1': '1.5'}, "Línea 1: el producto y la cantidad"),
+    ({'cliente_id': '1', 'producto_id_2': 'x', 'cantidad_2': '1'}, "Línea 2: el producto y la cantidad"),
+    ({'cliente_id': '1', 'producto_id_1': '0', 'cantidad_1': '1'}, "Línea 1: producto no válido."),
+    ({'cliente_id': '1', 'producto_id_1': '1', 'cantidad_1': '-2'}, "Línea 1: la cantidad debe ser mayor que cero."),
+    ({'cliente_id': '1', 'producto_id_1': '1', 'cantidad_1': '0'}, "Línea 1: la cantidad debe ser mayor que cero."),
+    ({'cliente_id': '1', 'producto_id_1': '1', 'cantidad_1': '2147483648'}, "Línea 1: la cantidad es demasiado grande."),
+])
+def test_datos_invalidos_no_llegan_a_la_base(cliente, datos, mensaje):
+    respuesta = cliente.post('/factura/nueva', data=datos)
+    assert respuesta.status_code == 400
+    assert respuesta.get_data(as_text=True).startswith(mensaje)
+    assert db._pool is None